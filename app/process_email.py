@@ -6,12 +6,13 @@ Modify this file to implement your specific email processing requirements.
 
 The process_email function is called for each new email received.
 """
+import logging
 from typing import Dict, Any
 from datetime import datetime
 from src.utils.logger import setup_logger
-from src.utils.email_utils import get_headers, extract_message_body, extract_attachments
+from src.utils.email_utils import get_headers, extract_message_bodies, extract_message_body, extract_attachments
 from src.utils.telegram_utils import send_telegram_message, send_email_notification
-from src.config import config
+from src.config import get_config
 
 from app.utils import parse_date
 
@@ -21,6 +22,12 @@ from app.models import SampleTableModel
 
 logger = setup_logger(__name__)
 
+# Header fallbacks
+_NO_SUBJECT = 'No Subject'
+_UNKNOWN_SENDER = 'Unknown Sender'
+_UNKNOWN_RECIPIENT = 'Unknown Recipient'
+_UNKNOWN_DATE = 'Unknown Date'
+_LABEL_SEPARATOR = ", "
 
 
 def process_email(message: Dict[str, Any]) -> None:
@@ -52,18 +59,23 @@ def process_email(message: Dict[str, Any]) -> None:
         
         # Extract headers
         headers = get_headers(message)
-        subject = headers.get('subject', 'No Subject')
-        sender = headers.get('from', 'Unknown Sender')
-        recipient = headers.get('to', 'Unknown Recipient')
-        date = headers.get('date', 'Unknown Date')
-        # logger.info(message)  # Debug log to see message structure
+        subject = headers.get('subject', _NO_SUBJECT)
+        sender = headers.get('from', _UNKNOWN_SENDER)
+        recipient = headers.get('to', _UNKNOWN_RECIPIENT)
+        date = headers.get('date', _UNKNOWN_DATE)
+        logger.debug("Message payload: %s", message)  # Debug log to see message structure
         
-        # Extract message body
-        body_text = extract_message_body(message, html_part=True, strip_html=True)
-        if not body_text:
-            # Getting plain text instead...
-            body_text = extract_message_body(message, html_part=False)
-            logger.warning("No HTML body found, using plain text for message %s", message_id)
+        # Extract message body (HTML and plain text are collected in a single pass).
+        # Notifications only use the snippet and headers, so the decode and HTML parse
+        # are skipped unless the body is logged or GMAIL_EXTRACT_BODY is enabled.
+        body_text = None
+        if logger.isEnabledFor(logging.DEBUG) or get_config().is_email_body_required():
+            bodies = extract_message_bodies(message, strip_html=True)
+            body_text = bodies['text/html']
+            if not body_text:
+                # Getting plain text instead...
+                body_text = bodies['text/plain']
+                logger.warning("No HTML body found, using plain text for message %s", message_id)
         
         # Log the email details
         logger.info("Processing email:")
@@ -73,8 +85,12 @@ def process_email(message: Dict[str, Any]) -> None:
         logger.info(f"  To: {recipient}")
         logger.info(f"  Date: {date}")
         logger.info(f"  Snippet: {snippet}")
-        logger.info(f"  Body length: {len(body_text)} characters")
-        logger.info(f"  Body Snippet: {body_text[:400]}")
+        # body_text is None unless DEBUG logging is on or GMAIL_EXTRACT_BODY is set;
+        # enable GMAIL_EXTRACT_BODY before using it in your own processing below
+        if body_text is not None:
+            logger.info(f"  Body length: {len(body_text)} characters")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("  Body Snippet: %s", body_text[:400])
         
         # TODO: Implement your custom email processing logic here
         # Examples of what you might want to do:
@@ -86,10 +102,12 @@ def process_email(message: Dict[str, Any]) -> None:
             subject, 
             sender, 
             snippet, 
-            ", ".join(labelIds),
+            _LABEL_SEPARATOR.join(labelIds),
             message_id
         )
-        if result['success']:
+        if result.get('queued'):
+            logger.info("✓ Telegram message queued")
+        elif result['success']:
             logger.info("✓ Telegram message sent successfully")
         else:
             logger.error(f"✗ Failed to send Telegram message: {result['error']}")
@@ -12,18 +12,20 @@ This is the main Cloud Run service that handles:
 import os
 import json
 import base64
+import asyncio
+import threading
 from pathlib import Path
 from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
 from google.cloud import secretmanager
 from src.gmail_handler import GmailHandler
 from src.watch_manager import WatchManager
 from src.utils.logger import setup_logger
+from src.utils.telegram_utils import telegram_notifier
 from src.database import init_database, close_database, get_database
-from dotenv import load_dotenv
-from src.config import env_var_map
+from src.config import env_var_map, load_env_vars
 
 # Load environment variables from .env file if it exists
-load_dotenv()
+load_env_vars()
 
 # Set up logging
 logger = setup_logger(__name__)
@@ -49,9 +51,21 @@ async def startup_event():
     else:
         logger.info("ℹ️ Database initialization skipped (not configured or disabled)")
 
+    # Send Telegram notifications from background workers
+    await telegram_notifier.start()
+
+    # Build credentials and the Gmail client in the background so the first request doesn't wait
+    global _prewarm_task
+    _prewarm_task = asyncio.create_task(prewarm_gmail_clients())
+
 @fapp.on_event("shutdown")
 async def shutdown_event():
     """Clean up database connection during application shutdown."""
+    # Let messages already being processed finish before their notifications are flushed
+    if gmail_handler is not None:
+        await asyncio.to_thread(gmail_handler.close)
+    await telegram_notifier.stop()
+
     logger.info("🔄 Shutting down database connection...")
     close_database()
     logger.info("✅ Database connection closed")
@@ -59,6 +73,19 @@ async def shutdown_event():
 # Global variables for handlers
 gmail_handler = None
 watch_manager = None
+_handlers_lock = threading.Lock()
+_prewarm_task = None
+
+
+async def prewarm_gmail_clients():
+    """Initialize the handlers and build the Gmail API client off the event loop."""
+    try:
+        await asyncio.to_thread(get_service_account_info)
+        await watch_manager.prewarm()
+        logger.info("✅ Gmail API clients prewarmed")
+    except Exception as e:
+        # Not fatal: handlers are initialized again on the first request
+        logger.warning(f"Gmail client prewarm failed: {e}")
 
 
 def process_gmail_history_background(history_id: str, email_address: str = None, notification_type: str = "history"):
@@ -125,14 +152,29 @@ def get_service_account_info():
     Returns:
         Service account info dictionary
     """
-    global gmail_handler, watch_manager
-
     logger.info("🔐 Initializing service account credentials...")
 
-    if gmail_handler is not None:
+    # Both handlers are published together under the lock, so seeing both set means
+    # initialization is complete
+    if gmail_handler is not None and watch_manager is not None:
         logger.info("✅ Service account already initialized")
         return  # Already initialized
-    
+
+    # The startup prewarm and the first request may race to initialize
+    with _handlers_lock:
+        if gmail_handler is None or watch_manager is None:
+            _init_handlers()
+
+
+def _init_handlers():
+    """
+    Load the service account credentials and create the Gmail handler and watch manager.
+
+    Must be called with _handlers_lock held. The globals are only assigned once both
+    handlers have been created, so a failure leaves neither of them set.
+    """
+    global gmail_handler, watch_manager
+
     try:
         # Try to get from Secret Manager first
         project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
@@ -174,8 +216,14 @@ def get_service_account_info():
                 raise Exception("Service account credentials not found")
     
     # Initialize handlers
-    gmail_handler = GmailHandler(service_account_info)
-    watch_manager = WatchManager(service_account_info)
+    new_gmail_handler = GmailHandler(service_account_info)
+    try:
+        new_watch_manager = WatchManager(service_account_info)
+    except Exception:
+        new_gmail_handler.close()
+        raise
+
+    gmail_handler, watch_manager = new_gmail_handler, new_watch_manager
     logger.info("Initialized Gmail handler and watch manager")
 
 
@@ -18,7 +18,7 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.config import config, env_var_map
+from src.config import config, env_var_map, load_env_vars
 from .init import run_command
 
 GCLOUD_PATH = None
@@ -55,8 +55,7 @@ def validate_env_variables():
     print("✅ .env file exists")
 
     # Load environment variables
-    from dotenv import load_dotenv
-    load_dotenv()
+    load_env_vars()
 
     # Check required environment variables from env_var_map
     missing_vars = []
@@ -139,7 +138,8 @@ def get_gmail_service():
                 ]
             )
 
-        return build('gmail', 'v1', credentials=credentials)
+        # Use the discovery document bundled with the client library (no network fetch)
+        return build('gmail', 'v1', credentials=credentials, static_discovery=True, cache_discovery=False)
 
     except Exception as e:
         print(f"❌ Failed to initialize Gmail service: {e}")
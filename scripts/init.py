@@ -378,9 +378,10 @@ def step3_create_service_account():
             update_env_file('GMAIL_ACCOUNT_TYPE', 'workspace')
 
             # Also save to config.yaml
-            config.set('workspace.domain', workspace_domain)
-            config.set('workspace.delegated_user_email', delegated_user_email)
-            config.set('gmail.account_type', 'workspace')
+            with config.batch():
+                config.set('workspace.domain', workspace_domain)
+                config.set('workspace.delegated_user_email', delegated_user_email)
+                config.set('gmail.account_type', 'workspace')
 
             print(f"✓ Configured workspace delegation for {delegated_user_email} at {workspace_domain}")
         else:
@@ -445,6 +446,7 @@ def main():
 
         # Mark initialization as complete
         config.set('init.complete', 'true')
+        config.flush()
         print("✓ Marked initialization as complete in config.yaml")
 
         print("\n🎉 Initialization completed successfully!")
@@ -254,7 +254,9 @@ def clear_local_config():
     run_command("gcloud config unset run/region", check=False)
     run_command("gcloud config unset account", check=False)
 
-    # Remove config.yaml
+    # Remove config.yaml (write out pending changes first so they aren't
+    # flushed back to disk at exit)
+    config.flush()
     if os.path.exists("config.yaml"):
         os.remove("config.yaml")
         print("✅ Removed config.yaml file")
@@ -15,10 +15,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.process_email import process_email
 from app.dummy_data import DUMMY_EMAIL_PAYLOAD
 
-from dotenv import load_dotenv
+from src.config import load_env_vars
 
 # Load environment variables from .env file if it exists
-load_dotenv()
+load_env_vars()
 
 
 def main():
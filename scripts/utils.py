@@ -1,4 +1,5 @@
 import os
+import logging
 import subprocess
 import sys
 import shlex
@@ -11,6 +12,16 @@ sys.path.insert(0, str(project_root))
 
 GCLOUD_PATH = None
 
+# Per-command trace is only shown with LOG_LEVEL=DEBUG. It goes to the same
+# sys.stdout stream as print() and input(), so output stays in order.
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    _command_log_handler = logging.StreamHandler(sys.stdout)
+    _command_log_handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_command_log_handler)
+    logger.setLevel(getattr(logging, os.environ.get('LOG_LEVEL', 'INFO').upper(), logging.INFO))
+    logger.propagate = False
+
 def find_gcloud_executable():
     """Find the gcloud executable on the system."""
     global GCLOUD_PATH
@@ -44,7 +55,7 @@ def find_gcloud_executable():
 
 def run_command(cmd: str, check: bool = True) -> subprocess.CompletedProcess:
     """Run a shell command and return the result."""
-    print(f"Running: {cmd}")
+    logger.debug("Running: %s", cmd)
 
     # Set up environment
     env = os.environ.copy()
@@ -87,9 +98,7 @@ def run_command(cmd: str, check: bool = True) -> subprocess.CompletedProcess:
             result = subprocess.run(cmd, shell=True, capture_output=True, text=True, env=env)
 
     if check and result.returncode != 0:
-        print(f"Error running command: {cmd}")
-        print(f"stdout: {result.stdout}")
-        print(f"stderr: {result.stderr}")
+        print(f"Error running command: {cmd}\nstdout: {result.stdout}\nstderr: {result.stderr}")
         sys.exit(1)
 
     return result
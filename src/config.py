@@ -1,19 +1,161 @@
 """Configuration management for Gmail Pub/Sub project."""
 
 import os
+import re
+import copy
+import atexit
 import subprocess
 import yaml
 import inspect
-from typing import Dict, Any, Optional
+import functools
+import importlib.util
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
-import dotenv
 from src.utils.logger import setup_logger
 
 # Set up logging
 logger = setup_logger(__name__)
 
+# Optional faster YAML backend (Rust libyaml bindings); PyYAML is the fallback
+try:
+    import ryaml as _ryaml
+except ImportError:
+    _ryaml = None
+
+# Prefer the libyaml-backed C loader/dumper (PyYAML's optional yaml._yaml
+# extension), resolved once at import
+_YAML_C = importlib.util.find_spec("yaml._yaml") is not None and hasattr(yaml, "CSafeLoader")
+_LOADER = yaml.CSafeLoader if _YAML_C else yaml.SafeLoader
+_DUMPER = yaml.CSafeDumper if _YAML_C else yaml.SafeDumper
+if _YAML_C:
+    logger.debug("YAML C extension available")
+else:
+    logger.info("YAML C extension not installed - config load will be 6-10x slower")
+
+
+# Parsed config files keyed by path -> (st_mtime_ns, st_size, data)
+_parse_cache: Dict[Path, Tuple[int, int, Dict[str, Any]]] = {}
+
+
+def _yaml_loads(text: str) -> Any:
+    """Parse a YAML document using the fastest available backend."""
+    if _ryaml is not None:
+        return _ryaml.loads(text)
+    return yaml.load(text, Loader=_LOADER)
+
+
+# Effectively no line wrapping (libyaml needs a C int here, not float('inf'))
+_YAML_MAX_WIDTH = 2**31 - 1
+
+
+def _yaml_dump(data: Any, stream) -> None:
+    """Serialize data as YAML straight into an open text stream."""
+    if _ryaml is not None:
+        stream.write(_ryaml.dumps(data))
+        return
+    yaml.dump(
+        data,
+        stream,
+        Dumper=_DUMPER,
+        default_flow_style=False,
+        indent=2,
+        allow_unicode=True,
+        sort_keys=False,
+        width=_YAML_MAX_WIDTH,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _env(name: str) -> Optional[str]:
+    """Cached environment variable lookup (see invalidate_env_cache)."""
+    return os.environ.get(name)
+
+
+def invalidate_env_cache() -> None:
+    """Drop cached environment values after os.environ or .env changes."""
+    _env.cache_clear()
+
+
+# A double quoted value (with backslash escapes) or a single quoted value, up to its closing quote
+_ENV_QUOTED_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|\'([^\']*)\'')
+
+
+def _parse_env_file(path: Path) -> Dict[str, str]:
+    """
+    Parse a .env file of KEY=VALUE lines.
+
+    Supports blank lines, '#' comments, an optional 'export ' prefix, single or
+    double quoted values and trailing ' # comments'.
+    Variable interpolation and multi-line values are not supported.
+    """
+    values: Dict[str, str] = {}
+    for line in path.read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+
+        key, value = line.split('=', 1)
+        key = key.strip()
+        if key.startswith('export '):
+            key = key[7:].strip()
+        value = value.strip()
+
+        quoted = _ENV_QUOTED_RE.match(value) if value[:1] in ('"', "'") else None
+        if quoted:
+            # The closing quote ends the value; anything after it (e.g. a comment) is ignored
+            if value[0] == '"':
+                value = quoted.group(1).replace('\\n', '\n').replace('\\"', '"')
+            else:
+                value = quoted.group(2)
+        else:
+            comment_at = value.find(' #')
+            if comment_at != -1:
+                value = value[:comment_at].rstrip()
+
+        if key:
+            values[key] = value
+    return values
+
+
+def load_env_vars(env_file: Path = Path('.env'), override: bool = False) -> bool:
+    """
+    Load variables from a .env file into os.environ.
+
+    Args:
+        env_file: Path to the .env file
+        override: Whether to overwrite variables that are already set
+
+    Returns:
+        True if the file was found and loaded
+    """
+    try:
+        values = _parse_env_file(Path(env_file))
+    except FileNotFoundError:
+        return False
+
+    for key, value in values.items():
+        if override or key not in os.environ:
+            os.environ[key] = value
+    invalidate_env_cache()
+    return True
+
+
+# Apply .env once, at import, before anything reads the environment: its values take
+# precedence over variables already set (load_env_vars() calls made later without
+# override only add keys that are missing). True once .env has been loaded.
+_DOTENV_LOADED = load_env_vars(Path('.env'), override=True)
+
+_CALLED_FROM_SCRIPTS: Optional[bool] = None
+_SCRIPTS_DIR_MARKERS = tuple(f"{sep}scripts{sep}" for sep in (os.sep, os.altsep) if sep)
+
+
 def _is_called_from_scripts() -> bool:
     """Check if this module is being imported from the scripts folder."""
+    global _CALLED_FROM_SCRIPTS
+    if _CALLED_FROM_SCRIPTS is not None:
+        return _CALLED_FROM_SCRIPTS
+
     frame = inspect.currentframe()
     try:
         # Walk up the call stack to find the original caller
@@ -21,13 +163,14 @@ def _is_called_from_scripts() -> bool:
             frame = frame.f_back
             if frame and frame.f_code.co_filename:
                 filename = frame.f_code.co_filename
-                path_parts = Path(filename).parts
                 # Check if the caller is from the scripts folder
-                if 'scripts' in path_parts:
-                    logger.debug(f"Found scripts in call stack: {filename}")
+                if any(marker in filename for marker in _SCRIPTS_DIR_MARKERS):
+                    logger.debug("Found scripts in call stack: %s", filename)
+                    _CALLED_FROM_SCRIPTS = True
                     return True
-                logger.debug(f"Checking frame: {filename}")
+                logger.debug("Checking frame: %s", filename)
         logger.debug("No scripts found in call stack")
+        _CALLED_FROM_SCRIPTS = False
         return False
     finally:
         del frame
@@ -76,6 +219,14 @@ env_var_map = {
     # "app.port": "PORT"
 }
 
+# Pre-split dotted keys so Config.get doesn't re-split them on every call
+_KEY_PATHS: Dict[str, Tuple[str, ...]] = {key: tuple(key.split('.')) for key in env_var_map}
+
+
+def _split_key(key: str) -> Tuple[str, ...]:
+    """Split a dotted config key into its path components."""
+    return _KEY_PATHS.get(key) or tuple(key.split('.'))
+
 class Config:
     """Manages configuration with YAML file persistence and user prompts."""
 
@@ -84,6 +235,12 @@ class Config:
         self.config: Dict[str, Any] = {}
         self.env_file = Path(".env")
 
+        # Writes are deferred until flush() so populating many keys serializes the
+        # YAML once instead of once per key. Only the global instance (get_config())
+        # is flushed automatically at exit; other instances must call flush() themselves.
+        self._dirty = False
+        self._batch_depth = 0
+
         # Auto-detect if we should load config based on caller context
         if auto_load is None:
             auto_load = _is_called_from_scripts()
@@ -94,7 +251,6 @@ class Config:
         else:
             logger.info("Config auto-loading disabled (not called from scripts)")
 
-        self.load_env_file()
         self.run_command = None
     
     def load_run_command(self, method: callable = None) -> None:
@@ -104,20 +260,71 @@ class Config:
     
     def load_config(self) -> None:
         """Load configuration from YAML file if it exists."""
-        if self.config_file.exists():
-            with open(self.config_file, 'r') as f:
-                self.config = yaml.safe_load(f) or {}
-                logger.info(f"Loaded configuration from {self.config_file}")
+        # Persist pending changes first so a reload doesn't drop them
+        self.flush()
+
+        try:
+            f = open(self.config_file, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+
+        with f:
+            st = os.fstat(f.fileno())
+            cached = _parse_cache.get(self.config_file)
+            if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                self.config = copy.deepcopy(cached[2])
+                logger.debug(f"Loaded configuration from cache for {self.config_file}")
+                return
+
+            self.config = _yaml_loads(f.read()) or {}
+            logger.info(f"Loaded configuration from {self.config_file}")
+        _parse_cache[self.config_file] = (st.st_mtime_ns, st.st_size, copy.deepcopy(self.config))
 
     def load_env_file(self) -> None:
-        """Load environment variables from .env file if it exists."""
-        if self.env_file.exists():
-            dotenv.load_dotenv(self.env_file, override=True)
+        """
+        Load environment variables from .env file if it exists (once per process).
+
+        The default .env is already loaded when this module is imported.
+        """
+        global _DOTENV_LOADED
+        if _DOTENV_LOADED:
+            return
+
+        _DOTENV_LOADED = load_env_vars(self.env_file, override=True)
     
     def save_config(self) -> None:
         """Save current configuration to YAML file."""
-        with open(self.config_file, 'w') as f:
-            yaml.dump(self.config, f, default_flow_style=False, indent=2)
+        with open(self.config_file, 'w', encoding='utf-8') as f:
+            _yaml_dump(self.config, f)
+            f.flush()
+            st = os.fstat(f.fileno())
+        self._dirty = False
+
+        # Keep the parse cache in sync so a reload in this process skips the disk
+        _parse_cache[self.config_file] = (st.st_mtime_ns, st.st_size, copy.deepcopy(self.config))
+
+    def flush(self) -> None:
+        """Write pending configuration changes to the YAML file, if any."""
+        if self._dirty:
+            self.save_config()
+
+    @contextmanager
+    def batch(self):
+        """
+        Group several config changes into a single write.
+
+        Usage:
+            with config.batch():
+                config.set('workspace.domain', domain)
+                config.set('gmail.account_type', 'workspace')
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
     
     def get(self, key: str, prompt: str = None, default: str = None, cmd:str = None, yaml_only:bool = False) -> str:
         """
@@ -131,10 +338,8 @@ class Config:
         Returns:
             Configuration value
         """
-        global env_var_map
-
         # Navigate nested keys
-        keys = key.split('.')
+        keys = _split_key(key)
         current = self.config
         # print(current) # Debug
         # Check if value exists
@@ -148,20 +353,12 @@ class Config:
 
         # Check for environment variable first
         env_var_name = env_var_map.get(key)
-        if env_var_name and os.getenv(env_var_name) and not yaml_only:
-            value = os.getenv(env_var_name)
-            current[keys[-1]] = value
-            self.save_config()
-            return value
+        env_value = _env(env_var_name) if env_var_name and not yaml_only else None
+        if env_value:
+            current[keys[-1]] = env_value
+            self._dirty = True
+            return env_value
 
-        if not yaml_only:
-            # Attempt to get it from env. 
-            if env_var_name and os.getenv(env_var_name):
-                value = os.getenv(env_var_name)
-                # current[keys[-1]] = value
-                # self.save_config()
-                return value
-        
         # Value doesn't exist, prompt user
         if prompt:
             if cmd and self.run_command:
@@ -175,14 +372,14 @@ class Config:
             
             # Save the value
             current[keys[-1]] = value
-            self.save_config()
+            self._dirty = True
             return value
         
         return default or ""
     
     def set(self, key: str, value: str) -> None:
         """Set configuration value and save."""
-        keys = key.split('.')
+        keys = _split_key(key)
         current = self.config
         
         for k in keys[:-1]:
@@ -191,7 +388,7 @@ class Config:
             current = current[k]
         
         current[keys[-1]] = value
-        self.save_config()
+        self._dirty = True
     
     def get_project_id(self, yaml_only:bool = False) -> str:
         """Get Google Cloud project ID."""
@@ -316,7 +513,7 @@ class Config:
     def is_oauth_enabled(self) -> bool:
         """Check if OAuth authentication is configured."""
         # Only check environment variable for token JSON string (no file fallback)
-        token_json = os.getenv('GMAIL_OAUTH_TOKEN_JSON')
+        token_json = _env('GMAIL_OAUTH_TOKEN_JSON')
         return bool(token_json)
 
     def get_gmail_account_type(self) -> str:
@@ -347,7 +544,9 @@ class Config:
         
     def get_gmail_watch_labels(self, yaml_only:bool = False) -> list:
         """Get Gmail labels to watch for incoming emails."""
-        gmail_labels_env = os.environ.get('GMAIL_WATCH_LABELS', 'INBOX')
+        gmail_labels_env = _env('GMAIL_WATCH_LABELS')
+        if gmail_labels_env is None:
+            gmail_labels_env = 'INBOX'
         # Split by comma and strip whitespace
         gmail_labels = [label.strip() for label in gmail_labels_env.split(',') if label.strip()]
 
@@ -355,13 +554,31 @@ class Config:
 
     def get_gmail_watch_label_ids(self) -> list:
         """Get Gmail label IDs to watch for incoming emails."""
-        label_ids_env = os.environ.get('GMAIL_WATCH_LABEL_IDS', '')
+        label_ids_env = _env('GMAIL_WATCH_LABEL_IDS')
         if not label_ids_env:
             return []
         # Split by comma and strip whitespace
         label_ids = [label_id.strip() for label_id in label_ids_env.split(',') if label_id.strip()]
         return label_ids
 
+    def is_email_body_required(self) -> bool:
+        """Check if email processing needs decoded message bodies (not just snippet and headers)."""
+        return (_env('GMAIL_EXTRACT_BODY') or '').strip().lower() in ('1', 'true', 'yes')
+
+    def get_gmail_processing_workers(self, default: int = 8) -> int:
+        """Get the number of messages processed concurrently (GMAIL_PROCESSING_WORKERS)."""
+        workers_env = _env('GMAIL_PROCESSING_WORKERS')
+        if not workers_env:
+            return default
+        try:
+            workers = int(workers_env)
+        except ValueError:
+            workers = 0
+        if workers < 1:
+            logger.warning(f"Invalid GMAIL_PROCESSING_WORKERS value {workers_env!r}, using {default}")
+            return default
+        return workers
+
     def set_gmail_watch_label_ids(self, label_ids: list) -> None:
         """Set Gmail label IDs environment variable."""
         label_ids_str = ','.join(label_ids)
@@ -370,29 +587,57 @@ class Config:
 
     def _update_env_file(self, key: str, value: str) -> None:
         """Update or add a key-value pair in the .env file."""
+        self._update_env_file_many({key: value})
+
+    def _update_env_file_many(self, updates: Dict[str, str]) -> None:
+        """Update or add several key-value pairs in the .env file in one pass."""
         env_file = Path('.env')
         lines = []
-        key_found = False
+        pending = dict(updates)
 
-        if env_file.exists():
-            with open(env_file, 'r') as f:
-                lines = f.readlines()
+        try:
+            lines = env_file.read_text(encoding='utf-8').splitlines(keepends=True)
+        except FileNotFoundError:
+            pass
 
-        # Update existing key or mark for addition
+        # Update existing keys in place, keeping comments and ordering intact
         for i, line in enumerate(lines):
-            if line.strip().startswith(f'{key}='):
-                lines[i] = f'{key}={value}\n'
-                key_found = True
-                break
+            key = line.split('=', 1)[0].strip() if '=' in line else None
+            if key in pending:
+                lines[i] = f'{key}={pending.pop(key)}\n'
 
-        # Add new key if not found
-        if not key_found:
-            lines.append(f'{key}={value}\n')
+        # Add new keys that were not found
+        if lines and not lines[-1].endswith('\n'):
+            lines[-1] += '\n'
+        lines.extend(f'{key}={value}\n' for key, value in pending.items())
 
         # Write back to file
-        with open(env_file, 'w') as f:
+        with open(env_file, 'w', encoding='utf-8') as f:
             f.writelines(lines)
+        invalidate_env_cache()
+
+
+# Global config instance, created on first use (see get_config)
+_config: Optional[Config] = None
+
+
+def get_config() -> Config:
+    """Get the global config instance, creating it on first use."""
+    global _config
+    if _config is None:
+        _config = Config()
+    return _config
+
+
+@atexit.register
+def _flush_config() -> None:
+    """Write the global config instance's pending changes at exit."""
+    if _config is not None:
+        _config.flush()
 
 
-# Global config instance
-config = Config()
+def __getattr__(name: str) -> Any:
+    """Lazily create the module-level ``config`` instance on first access."""
+    if name == 'config':
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -10,15 +10,17 @@ This module provides a simple interface for database operations with support for
 """
 
 import os
+import functools
+import threading
 from typing import Optional, Type, TypeVar, Generic, List, Any
-from sqlalchemy import create_engine, MetaData, text
+from sqlalchemy import create_engine, MetaData, event, text, insert, inspect as sa_inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
 from pathlib import Path
 from src.utils.logger import setup_logger
-from src.config import config
+from src.config import get_config
 
 logger = setup_logger(__name__)
 
@@ -28,6 +30,54 @@ T = TypeVar('T')
 # SQLAlchemy base class for all models
 Base = declarative_base()
 
+# Supported URL schemes (driver suffixes like '+psycopg2' are ignored)
+_URL_SCHEMES = {
+    'sqlite': 'sqlite',
+    'postgresql': 'postgresql',
+    'postgres': 'postgresql',
+}
+
+
+def _url_dialect(url: str) -> Optional[str]:
+    """Return 'sqlite' or 'postgresql' for a database URL, or None if it has no known scheme."""
+    scheme, sep, _ = url.partition('://')
+    if not sep:
+        return None
+    return _URL_SCHEMES.get(scheme.split('+', 1)[0].lower())
+
+
+# Prebuilt statements for connection and health checks
+_PING_SQLITE = text("SELECT 1")
+_PING_PG = text("SELECT version()")
+_HEALTH_SQLITE = text("SELECT 1 as test")
+_HEALTH_PG = text("SELECT 1 as test, version() as version")
+
+
+# Faster (less durable) settings for local SQLite databases, enabled with DB_SQLITE_FAST=1
+_SQLITE_FAST_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+
+def _apply_sqlite_fast_pragmas(dbapi_connection, connection_record):
+    """Apply _SQLITE_FAST_PRAGMAS to a new SQLite DBAPI connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in _SQLITE_FAST_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+@functools.lru_cache(maxsize=128)
+def _compiled_text(query: str):
+    """Return a cached TextClause for a raw SQL string."""
+    return text(query)
+
 class DatabaseManager:
     """
     Database connection and session management.
@@ -44,26 +94,46 @@ class DatabaseManager:
             database_url: Database connection string or SQLite file path.
                          If None, checks DATABASE_URL environment variable.
                          If empty/None, database functionality is disabled.
+                         The configured URL is resolved on first use, not here.
         """
-        self.database_url = database_url or config.get('DATABASE_URL', '').strip()
+        self.database_url = database_url
         self.engine = None
         self.SessionLocal = None
         self.is_connected = False
+        self._url_resolved = False
+        self._url_lock = threading.Lock()
+        self._dialect: Optional[str] = None
 
-        # If no database URL provided, disable database functionality
-        if not self.database_url:
-            logger.info("No database URL provided, database functionality disabled")
+    def _resolve_database_url(self):
+        """Resolve the database URL from config on first use (safe to call from several threads)."""
+        if self._url_resolved:
             return
-            
-        self._process_database_url()
+
+        with self._url_lock:
+            if self._url_resolved:
+                return
+
+            if not self.database_url:
+                self.database_url = get_config().get('DATABASE_URL', '').strip()
+
+            # If no database URL provided, disable database functionality
+            if not self.database_url:
+                logger.info("No database URL provided, database functionality disabled")
+            else:
+                self._process_database_url()
+
+            # Only mark the URL resolved once it is final, so other threads never see it half set
+            self._url_resolved = True
     
     def _process_database_url(self):
         """Process and validate the database URL."""
         if not self.database_url:
             return
             
+        self._dialect = _url_dialect(self.database_url)
+
         # Handle SQLite file paths (relative or absolute)
-        if not self.database_url.startswith(('sqlite:///', 'postgresql://', 'postgres://')):
+        if self._dialect is None:
             # Assume it's a SQLite file path
             sqlite_path = Path(self.database_url)
             
@@ -75,6 +145,7 @@ class DatabaseManager:
                 self.database_url = f"sqlite:///{sqlite_path}"
             else:
                 self.database_url = f"sqlite:///{sqlite_path.resolve()}"
+            self._dialect = 'sqlite'
             
         logger.info(f"Database URL configured: {self._mask_url(self.database_url)}")
     
@@ -84,7 +155,7 @@ class DatabaseManager:
             return "None"
         
         # Mask password in PostgreSQL URLs
-        if 'postgresql://' in url or 'postgres://' in url:
+        if _url_dialect(url) == 'postgresql':
             parts = url.split('@')
             if len(parts) > 1:
                 user_pass = parts[0].split('//')[-1]
@@ -101,6 +172,7 @@ class DatabaseManager:
         Returns:
             bool: True if connection successful, False otherwise
         """
+        self._resolve_database_url()
         if not self.database_url:
             logger.warning("No database URL configured, cannot connect")
             return False
@@ -111,13 +183,17 @@ class DatabaseManager:
             
         try:
             # Create engine with appropriate settings
-            if self.database_url.startswith('sqlite:'):
+            if self._dialect == 'sqlite':
                 # SQLite specific settings
                 self.engine = create_engine(
                     self.database_url,
                     connect_args={"check_same_thread": False},  # Allow multiple threads
                     echo=False  # Set to True for SQL debugging
                 )
+                if os.environ.get('DB_SQLITE_FAST') == '1':
+                    # WAL + synchronous=NORMAL: far fewer fsyncs per commit
+                    event.listen(self.engine, "connect", _apply_sqlite_fast_pragmas)
+                    logger.info("SQLite fast mode enabled (WAL, synchronous=NORMAL)")
             else:
                 # PostgreSQL settings
                 self.engine = create_engine(
@@ -130,10 +206,7 @@ class DatabaseManager:
             
             # Test connection
             with self.engine.connect() as conn:
-                if self.database_url.startswith('sqlite:'):
-                    conn.execute(text("SELECT 1"))
-                else:
-                    conn.execute(text("SELECT version()"))
+                conn.execute(_PING_SQLITE if self._dialect == 'sqlite' else _PING_PG)
             
             # Create session factory
             self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
@@ -249,7 +322,7 @@ class DatabaseManager:
             raise RuntimeError("Database not connected")
             
         with self.get_session() as session:
-            return session.execute(text(query), params or {})
+            return session.execute(_compiled_text(query), params or {})
     
     def health_check(self) -> dict:
         """
@@ -258,6 +331,7 @@ class DatabaseManager:
         Returns:
             dict: Health status information
         """
+        self._resolve_database_url()
         if not self.database_url:
             return {
                 'status': 'disabled',
@@ -272,15 +346,13 @@ class DatabaseManager:
             
         try:
             with self.get_session() as session:
-                if self.database_url.startswith('sqlite:'):
-                    result = session.execute(text("SELECT 1 as test")).fetchone()
-                else:
-                    result = session.execute(text("SELECT 1 as test, version() as version")).fetchone()
+                health_sql = _HEALTH_SQLITE if self._dialect == 'sqlite' else _HEALTH_PG
+                result = session.execute(health_sql).fetchone()
                 
                 return {
                     'status': 'healthy',
                     'connected': True,
-                    'url_type': 'sqlite' if self.database_url.startswith('sqlite:') else 'postgresql',
+                    'url_type': self._dialect,
                     'test_query': bool(result)
                 }
                 
@@ -308,6 +380,8 @@ class BaseRepository(Generic[T]):
         """
         self.db = db
         self.model_class = model_class
+        # Mapped attribute names accepted by update()
+        self._mapped_attrs = frozenset(sa_inspect(model_class).attrs.keys())
     
     def create(self, **kwargs) -> Optional[T]:
         """Create a new record."""
@@ -326,6 +400,44 @@ class BaseRepository(Generic[T]):
             logger.error(f"Error creating {self.model_class.__name__}: {e}")
             raise
     
+    def bulk_create(self, items: List[dict]) -> int:
+        """
+        Insert many records in a single statement and transaction.
+
+        Args:
+            items: List of column-value dictionaries, one per record
+
+        Returns:
+            Number of records inserted
+        """
+        if not self.db.is_connected:
+            logger.warning("Database not connected, cannot create records")
+            return 0
+
+        if not items:
+            return 0
+
+        try:
+            with self.db.get_session() as session:
+                session.execute(insert(self.model_class), items)
+            return len(items)
+        except Exception as e:
+            logger.error(f"Error bulk creating {self.model_class.__name__}: {e}")
+            raise
+
+    @contextmanager
+    def session_scope(self):
+        """
+        Run several operations in one session and transaction.
+
+        Usage:
+            with repo.session_scope() as session:
+                for data in rows:
+                    session.add(Model(**data))
+        """
+        with self.db.get_session() as session:
+            yield session
+
     def get_by_id(self, id: Any) -> Optional[T]:
         """Get record by ID."""
         if not self.db.is_connected:
@@ -333,7 +445,7 @@ class BaseRepository(Generic[T]):
             
         try:
             with self.db.get_session() as session:
-                return session.query(self.model_class).filter(self.model_class.id == id).first()
+                return session.get(self.model_class, id)
         except Exception as e:
             logger.error(f"Error getting {self.model_class.__name__} by ID {id}: {e}")
             return None
@@ -357,11 +469,10 @@ class BaseRepository(Generic[T]):
             
         try:
             with self.db.get_session() as session:
-                instance = session.query(self.model_class).filter(self.model_class.id == id).first()
+                instance = session.get(self.model_class, id)
                 if instance:
-                    for key, value in kwargs.items():
-                        if hasattr(instance, key):
-                            setattr(instance, key, value)
+                    for key in self._mapped_attrs.intersection(kwargs):
+                        setattr(instance, key, kwargs[key])
                     session.flush()
                     session.refresh(instance)
                     return instance
@@ -377,7 +488,7 @@ class BaseRepository(Generic[T]):
             
         try:
             with self.db.get_session() as session:
-                instance = session.query(self.model_class).filter(self.model_class.id == id).first()
+                instance = session.get(self.model_class, id)
                 if instance:
                     session.delete(instance)
                     return True
@@ -399,13 +510,23 @@ class BaseRepository(Generic[T]):
             return 0
 
 
-# Global database instance
-db = DatabaseManager()
+# Global database instance, created on first use (see get_database)
+_db: Optional[DatabaseManager] = None
 
 
 def get_database() -> DatabaseManager:
     """Get the global database instance."""
-    return db
+    global _db
+    if _db is None:
+        _db = DatabaseManager()
+    return _db
+
+
+def __getattr__(name: str) -> Any:
+    """Lazily create the module-level ``db`` instance on first access."""
+    if name == 'db':
+        return get_database()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def init_database() -> bool:
@@ -417,9 +538,9 @@ def init_database() -> bool:
     Returns:
         bool: True if database was initialized, False if disabled or failed
     """
-    return db.connect()
+    return get_database().connect()
 
 
 def close_database():
     """Close database connection during application shutdown."""
-    db.disconnect()
+    get_database().disconnect()
@@ -1,24 +1,64 @@
 """Gmail API handler for processing emails and managing authentication."""
 
 import base64
-import json
 import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-from google.oauth2 import service_account
+from typing import Dict, List, Any, Optional, Set, Tuple
+import orjson
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build, Resource
+from googleapiclient.discovery import Resource
 from googleapiclient.errors import HttpError
 from src.utils.logger import setup_logger
+from src.utils.email_utils import get_headers
+from src.utils.gmail_auth import (
+    get_gmail_service,
+    load_oauth_credentials,
+    load_service_account_credentials,
+)
 from app.process_email import process_email
-from src.config import config
+from src.config import get_config
 
 logger = setup_logger(__name__)
 
+# Matches a single HTML tag
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Requests per batch: Gmail accepts up to 100, but larger batches tend to be rate limited
+GMAIL_BATCH_SIZE = 50
+
+# Headers requested when only message metadata is needed
+METADATA_HEADERS = ['Subject', 'From', 'To', 'Date']
+
+# Partial response masks: only the fields this service reads are returned
+HISTORY_FIELDS = 'history(messagesAdded/message(id,labelIds)),historyId'
+MESSAGE_FIELDS = {
+    'full': (
+        'id,threadId,labelIds,snippet,historyId,internalDate,sizeEstimate,'
+        'payload(mimeType,filename,headers,body,parts)'
+    ),
+    'metadata': 'id,labelIds,payload/headers',
+}
+
+# HTTP statuses meaning the message no longer exists (deleted or purged since its history record)
+MESSAGE_GONE_STATUSES = (404, 410)
+
+# Number of notifications a message that keeps failing to fetch may hold back the history ID for
+MAX_FETCH_FAILURES = 5
 
 class GmailHandler:
     """Handles Gmail API operations and email processing."""
 
+    __slots__ = (
+        'state_file', '_state', '_state_mtime', 'service', 'credentials',
+        '_state_lock', '_in_flight_history_ids', '_pool'
+    )
+
+    service: Optional[Resource]
+
     def __init__(self, service_account_info: Dict[str, Any]):
         """
         Initialize Gmail handler with appropriate credentials based on account type.
@@ -26,18 +66,22 @@ class GmailHandler:
         Args:
             service_account_info: Service account credentials dictionary (for workspace accounts)
         """
+        config = get_config()
         account_type = config.get_gmail_account_type()
         logger.info(f"Initializing Gmail handler for account type: {account_type}")
 
         # Initialize state management
         self.state_file = Path("gmail_state.json")
+        self._state: Dict[str, Any] = {}
+        self._state_mtime: Optional[int] = None
         self.service = None
-
-        # Define Gmail scopes
-        scopes = [
-            'https://www.googleapis.com/auth/gmail.readonly',
-            'https://www.googleapis.com/auth/gmail.modify'
-        ]
+        self._state_lock = threading.Lock()
+        self._in_flight_history_ids: Set[str] = set()
+        # Messages are processed concurrently (process_email is I/O bound)
+        self._pool = ThreadPoolExecutor(
+            max_workers=config.get_gmail_processing_workers(),
+            thread_name_prefix="gmail-process"
+        )
 
         if account_type == "oauth":
             # Use OAuth refresh token for personal Gmail
@@ -49,21 +93,15 @@ class GmailHandler:
             delegated_user_email = os.getenv('DELEGATED_USER_EMAIL') or config.config.get('workspace', {}).get('delegated_user_email', '')
             logger.info(f"Using workspace delegation for user: {delegated_user_email}")
 
-            self.credentials = service_account.Credentials.from_service_account_info(
+            self.credentials = load_service_account_credentials(
                 service_account_info,
-                scopes=scopes,
                 subject=delegated_user_email
             )
 
         else:
             # Fallback to service account (for backward compatibility)
             logger.info("Using service account credentials")
-            self.credentials = service_account.Credentials.from_service_account_info(
-                service_account_info,
-                scopes=scopes
-            )
-
-        self.service: Optional[Resource] = None
+            self.credentials = load_service_account_credentials(service_account_info)
 
     def _get_oauth_credentials(self) -> Credentials:
         """
@@ -81,16 +119,9 @@ class GmailHandler:
             )
 
         try:
-            # Decode from base64 and parse JSON
-            token_json = base64.b64decode(token_base64).decode('utf-8')
-            token_data = json.loads(token_json)
-
-            return Credentials.from_authorized_user_info(token_data, scopes=[
-                'https://www.googleapis.com/auth/gmail.readonly',
-                'https://www.googleapis.com/auth/gmail.modify'
-            ])
+            return load_oauth_credentials(token_base64)
 
-        except (json.JSONDecodeError, ValueError, Exception) as e:
+        except (orjson.JSONDecodeError, ValueError, Exception) as e:
             logger.error(f"Error parsing OAuth token from environment: {e}")
             raise ValueError(
                 f"Invalid OAuth token in GMAIL_OAUTH_TOKEN_JSON environment variable: {e}. "
@@ -100,37 +131,92 @@ class GmailHandler:
     def get_service(self) -> Resource:
         """Get or create Gmail API service."""
         if not self.service:
-            self.service = build('gmail', 'v1', credentials=self.credentials)
+            self.service = get_gmail_service(self.credentials)
         return self.service
 
+    def close(self) -> None:
+        """Wait for in-flight messages to finish processing and stop the worker threads."""
+        self._pool.shutdown(wait=True)
+
+    def _load_state(self) -> Dict[str, Any]:
+        """
+        Get the persisted handler state, re-reading the state file when it has changed.
+
+        Other worker processes write the same file, so the cached copy is only
+        reused while the file's modification time is unchanged.
+        """
+        try:
+            mtime = self.state_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._state, self._state_mtime = {}, None
+            return self._state
+
+        if mtime != self._state_mtime:
+            try:
+                self._state = orjson.loads(self.state_file.read_bytes())
+                self._state_mtime = mtime
+            except FileNotFoundError:
+                self._state, self._state_mtime = {}, None
+            except Exception as e:
+                logger.warning(f"Error reading state file: {e}")
+                self._state, self._state_mtime = {}, None
+        return self._state
+
     def get_last_processed_history_id(self) -> Optional[str]:
         """Get the last processed history ID from state file."""
+        with self._state_lock:
+            return self._load_state().get('last_history_id')
+
+    def _write_state(self, state: Dict[str, Any]) -> None:
+        """Replace the state file with the given state (caller holds _state_lock)."""
+        # Write to a uniquely named temp file and swap it in, so a crash or another
+        # worker process writing at the same time never leaves a partial file
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.state_file.parent, prefix=f".{self.state_file.name}.", suffix='.tmp'
+        )
         try:
-            if self.state_file.exists():
-                with open(self.state_file, 'r') as f:
-                    state = json.load(f)
-                    return state.get('last_history_id')
-        except Exception as e:
-            logger.warning(f"Error reading state file: {e}")
-        return None
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(orjson.dumps(state))
+            os.replace(tmp_path, self.state_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        self._state = state
+        self._state_mtime = self.state_file.stat().st_mtime_ns
 
     def save_last_processed_history_id(self, history_id: str) -> None:
         """Save the last processed history ID to state file."""
         try:
-            state = {}
-            if self.state_file.exists():
-                with open(self.state_file, 'r') as f:
-                    state = json.load(f)
-
-            state['last_history_id'] = history_id
-
-            with open(self.state_file, 'w') as f:
-                json.dump(state, f)
+            with self._state_lock:
+                state = dict(self._load_state())
+                state['last_history_id'] = history_id
+                # Messages before the new starting point are never listed again
+                state.pop('fetch_failures', None)
+                self._write_state(state)
 
             logger.info(f"Saved last processed history ID: {history_id}")
         except Exception as e:
             logger.error(f"Error saving state file: {e}")
 
+    def _record_fetch_failures(self, message_ids: List[str]) -> List[str]:
+        """
+        Count another failed fetch for each message in the state file.
+
+        Returns:
+            The messages that may still hold back the history ID (fewer than
+            MAX_FETCH_FAILURES failures so far, across all worker processes)
+        """
+        with self._state_lock:
+            state = dict(self._load_state())
+            failures = dict(state.get('fetch_failures', {}))
+            for message_id in message_ids:
+                failures[message_id] = failures.get(message_id, 0) + 1
+            state['fetch_failures'] = failures
+            self._write_state(state)
+
+        return [message_id for message_id in message_ids if failures[message_id] < MAX_FETCH_FAILURES]
+
     def process_history(self, history_id: str) -> None:
         """
         Process Gmail history to find and handle new messages.
@@ -138,9 +224,16 @@ class GmailHandler:
         Args:
             history_id: Gmail history ID from Pub/Sub notification
         """
-        try:
-            service = self.get_service()
+        # Pub/Sub delivers at least once: a redelivery that arrives after this notification
+        # was saved is dropped by the history ID comparison below, one that arrives while
+        # it is still being processed is dropped here
+        with self._state_lock:
+            if history_id in self._in_flight_history_ids:
+                logger.info(f"History ID {history_id} is already being processed, skipping duplicate notification")
+                return
+            self._in_flight_history_ids.add(history_id)
 
+        try:
             # Get the last processed history ID
             last_processed_id = self.get_last_processed_history_id()
             logger.info(f"Last processed history ID: {last_processed_id}")
@@ -158,25 +251,25 @@ class GmailHandler:
             except (ValueError, TypeError):
                 logger.warning(f"Could not compare history IDs as integers, processing anyway")
 
-            # Get the current history ID to compare
-            profile = service.users().getProfile(userId='me').execute()
-            current_history_id = profile.get('historyId')
+            service = self.get_service()
 
             # Use the last processed ID as the starting point, or the incoming ID if no previous state
             start_history_id = last_processed_id if last_processed_id else history_id
 
-            logger.info(f"Processing history from {start_history_id} to {current_history_id}")
+            logger.info(f"Processing history from {start_history_id}")
 
-            # List history since the starting history ID
+            # List history since the starting history ID. The response also carries the
+            # mailbox's current history ID, so no separate getProfile call is needed.
             history_response = service.users().history().list(
                 userId='me',
                 startHistoryId=start_history_id,
-                historyTypes=['messageAdded']
+                historyTypes=['messageAdded'],
+                fields=HISTORY_FIELDS
             ).execute()
+            current_history_id = history_response.get('historyId') or history_id
 
             history_records = history_response.get('history', [])
             logger.info(f"Found {len(history_records)} history records to process")
-            # print(history_records)
             
             if not history_records:
                 logger.info("No new history records found")
@@ -184,29 +277,70 @@ class GmailHandler:
                 self.save_last_processed_history_id(history_id)
                 return
 
-            messages_processed = 0
+            config = get_config()
+            watch_labels = config.get_gmail_watch_label_ids() or config.get_gmail_watch_labels()
+
+            # Messages that could not be fetched because of transient errors; while any remain
+            # (up to MAX_FETCH_FAILURES times each) the history ID is not advanced
+            failed_ids: List[str] = []
+
+            # Collect the new message IDs first so they can be fetched in batches
+            candidates = []
             for record in history_records:
                 messages_added = record.get('messagesAdded', [])
                 for message_added in messages_added:
-                    message_id = message_added['message']['id']
-                    labelIds = message_added['message'].get('labelIds', [])
-                    # Filter for requested labels only
-                    watch_labels = config.get_gmail_watch_label_ids() or config.get_gmail_watch_labels()
-                    if watch_labels:
-                        if not any(label in labelIds for label in watch_labels):
-                            logger.info(f"Skipping message {message_id} due to label filter")
-                            continue
-                    
-                    logger.info(f"Processing new message: {message_id}")
-
-                    # Fetch and process the message
-                    message = self.fetch_message(message_id)
-                    if message:
-                        self.process_message(message)
-                        messages_processed += 1
+                    candidates.append((message_added['message']['id'], message_added['message'].get('labelIds')))
+
+            # Filter for requested labels only. History records normally carry the labels;
+            # any that don't are resolved with a cheap metadata-only fetch, never the full body.
+            if watch_labels:
+                unlabelled = [message_id for message_id, labelIds in candidates if labelIds is None]
+                if unlabelled:
+                    metadata, failed_metadata = self.fetch_messages_batch(
+                        unlabelled,
+                        message_format='metadata',
+                        metadata_headers=METADATA_HEADERS
+                    )
+                    failed_ids.extend(failed_metadata)
+                    fetched_labels = {message['id']: message.get('labelIds', []) for message in metadata}
+                    candidates = [
+                        (message_id, fetched_labels.get(message_id, []) if labelIds is None else labelIds)
+                        for message_id, labelIds in candidates
+                    ]
+
+            message_ids = []
+            for message_id, labelIds in candidates:
+                if watch_labels:
+                    if not any(label in (labelIds or []) for label in watch_labels):
+                        logger.info(f"Skipping message {message_id} due to label filter")
+                        continue
+
+                logger.info(f"Queued new message: {message_id}")
+                message_ids.append(message_id)
+
+            # Fetch the messages, then process them concurrently
+            messages, failed_messages = self.fetch_messages_batch(message_ids)
+            failed_ids.extend(failed_messages)
+            futures = [self._pool.submit(self.process_message, message) for message in messages]
+            wait(futures)
+            messages_processed = len(futures)
 
             logger.info(f"Processed {messages_processed} new messages")
 
+            if failed_ids:
+                retry_ids = self._record_fetch_failures(failed_ids)
+                if retry_ids:
+                    # Keep the old starting point so the next notification lists these messages again
+                    logger.warning(
+                        f"Failed to fetch {len(retry_ids)} messages, not advancing last processed "
+                        f"history ID past {start_history_id}: {', '.join(retry_ids)}"
+                    )
+                    return
+                logger.error(
+                    f"Giving up on {len(failed_ids)} messages after {MAX_FETCH_FAILURES} failed "
+                    f"fetches: {', '.join(failed_ids)}"
+                )
+
             # Save the current history ID as the last processed
             self.save_last_processed_history_id(str(current_history_id))
                         
@@ -214,13 +348,23 @@ class GmailHandler:
             logger.error(f"Gmail API error processing history: {e}")
         except Exception as e:
             logger.error(f"Unexpected error processing history: {e}")
+        finally:
+            with self._state_lock:
+                self._in_flight_history_ids.discard(history_id)
     
-    def fetch_message(self, message_id: str) -> Optional[Dict[str, Any]]:
+    def fetch_message(
+        self,
+        message_id: str,
+        message_format: str = 'full',
+        metadata_headers: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Fetch a Gmail message by ID.
         
         Args:
             message_id: Gmail message ID
+            message_format: Gmail message format ('full' or 'metadata')
+            metadata_headers: Headers to include when message_format is 'metadata'
             
         Returns:
             Message data or None if error
@@ -228,9 +372,7 @@ class GmailHandler:
         try:
             service = self.get_service()
             message = service.users().messages().get(
-                userId='me',
-                id=message_id,
-                format='full'
+                **self._message_request_kwargs(message_id, message_format, metadata_headers)
             ).execute()
             
             logger.info(f"Fetched message {message_id}")
@@ -243,6 +385,97 @@ class GmailHandler:
             logger.error(f"Unexpected error fetching message {message_id}: {e}")
             return None
     
+    @staticmethod
+    def _message_request_kwargs(
+        message_id: str,
+        message_format: str,
+        metadata_headers: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """Build the arguments of a messages().get request."""
+        request_kwargs = {'userId': 'me', 'id': message_id, 'format': message_format}
+        if message_format in MESSAGE_FIELDS:
+            request_kwargs['fields'] = MESSAGE_FIELDS[message_format]
+        if metadata_headers:
+            request_kwargs['metadataHeaders'] = metadata_headers
+        return request_kwargs
+
+    def fetch_messages_batch(
+        self,
+        message_ids: List[str],
+        message_format: str = 'full',
+        metadata_headers: Optional[List[str]] = None
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Fetch several Gmail messages using batched API requests.
+
+        Messages whose batch or batch item fails are retried one at a time. Messages
+        that no longer exist, or that Gmail refuses outright (other 4xx errors), are
+        dropped; only transient failures (429, 5xx, network errors) are reported back.
+
+        Args:
+            message_ids: Gmail message IDs
+            message_format: Gmail message format ('full' or 'metadata')
+            metadata_headers: Headers to include when message_format is 'metadata'
+
+        Returns:
+            Tuple of the fetched messages, in the same order as message_ids, and the
+            IDs of the messages that failed with a transient error
+        """
+        service = self.get_service()
+        fetched: Dict[str, Dict[str, Any]] = {}
+        # Batch request IDs must be unique
+        message_ids = list(dict.fromkeys(message_ids))
+
+        def on_message_fetched(request_id: str, response: Dict[str, Any], exception: Exception) -> None:
+            if exception is not None:
+                logger.warning(f"Gmail API error fetching message {request_id} in batch: {exception}")
+                return
+            logger.info(f"Fetched message {request_id}")
+            fetched[request_id] = response
+
+        for start in range(0, len(message_ids), GMAIL_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=on_message_fetched)
+            for message_id in message_ids[start:start + GMAIL_BATCH_SIZE]:
+                batch.add(
+                    service.users().messages().get(
+                        **self._message_request_kwargs(message_id, message_format, metadata_headers)
+                    ),
+                    request_id=message_id
+                )
+            try:
+                batch.execute()
+            except HttpError as e:
+                logger.warning(f"Gmail API error executing message batch: {e}")
+            except Exception as e:
+                logger.warning(f"Unexpected error executing message batch: {e}")
+
+        # Retry anything the batches didn't return with individual requests
+        failed_ids = []
+        for message_id in message_ids:
+            if message_id in fetched:
+                continue
+            try:
+                fetched[message_id] = service.users().messages().get(
+                    **self._message_request_kwargs(message_id, message_format, metadata_headers)
+                ).execute()
+                logger.info(f"Fetched message {message_id}")
+            except HttpError as e:
+                status = e.resp.status
+                if status in MESSAGE_GONE_STATUSES:
+                    logger.warning(f"Message {message_id} no longer exists, skipping")
+                elif status == 429 or status >= 500:
+                    logger.error(f"Gmail API error fetching message {message_id}: {e}")
+                    failed_ids.append(message_id)
+                else:
+                    logger.error(f"Gmail API rejected fetching message {message_id}, skipping: {e}")
+            except Exception as e:
+                # Timeouts and connection errors
+                logger.error(f"Unexpected error fetching message {message_id}: {e}")
+                failed_ids.append(message_id)
+
+        messages = [fetched[message_id] for message_id in message_ids if message_id in fetched]
+        return messages, failed_ids
+
     def process_message(self, message: Dict[str, Any]) -> None:
         """
         Process a Gmail message using the custom logic.
@@ -256,9 +489,9 @@ class GmailHandler:
             thread_id = message.get('threadId', 'unknown')
             
             # Get headers for subject and sender
-            headers = message.get('payload', {}).get('headers', [])
-            subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
-            sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'Unknown Sender')
+            headers = get_headers(message)
+            subject = headers.get('subject', 'No Subject')
+            sender = headers.get('from', 'Unknown Sender')
             
             logger.info(f"Processing message {message_id}: '{subject}' from {sender}")
             
@@ -295,8 +528,7 @@ class GmailHandler:
                 if data:
                     html_content = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
                     # Simple HTML tag removal (you might want to use a proper HTML parser)
-                    import re
-                    text += re.sub(r'<[^>]+>', '', html_content)
+                    text += _TAG_RE.sub('', html_content)
             
             # Handle multipart messages
             if 'parts' in part:
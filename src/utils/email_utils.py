@@ -5,17 +5,55 @@ This module contains general-purpose utilities for extracting and processing
 Gmail message data. These functions are used by the main email processing logic.
 """
 
+import re
+from html import unescape
 import base64
-from typing import Dict, Any, List
-from bs4 import BeautifulSoup
+import importlib.util
+from typing import Dict, Any, Iterator, List, Tuple
+from bs4 import BeautifulSoup, Comment
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# selectolax (lexbor C parser) is the fastest option for plain text extraction;
+# BeautifulSoup is used when it isn't installed
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# lxml's C parser is several times faster than the pure-Python html.parser
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+# Documents this small with only a handful of tags are stripped with a regex
+# instead of paying for a full parse, unless they contain content the regex
+# would leak into the text (scripts, styles, comments) or a bare '<' it would
+# mistake for the start of a tag
+_SMALL_HTML_SIZE = 512
+_SMALL_HTML_MAX_TAGS = 3
+_NON_TEXT_MARKUP_RE = re.compile(r'<(?:script|style|!--)', re.IGNORECASE)
+_BARE_LT_RE = re.compile(r'<(?![A-Za-z/!])')
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+
+
+def _normalize_whitespace(text: str) -> str:
+    """Collapse every run of whitespace in extracted text to a single space."""
+    return _WS_RE.sub(' ', text).strip()
+
+
+def _extract_text_with_selectolax(html_content: str) -> str:
+    """Extract text from HTML with selectolax, dropping scripts, styles and comments."""
+    tree = LexborHTMLParser(html_content)
+    for node in tree.css('script, style'):
+        node.decompose()
+    root = tree.body or tree.root
+    return root.text() if root is not None else ''
+
 
 def _extract_clean_text_from_html(html_content: str) -> str:
     """
-    Extract clean text from HTML content using BeautifulSoup.
+    Extract clean text from HTML content using selectolax or BeautifulSoup.
 
     This function removes:
     - All HTML tags
@@ -30,34 +68,43 @@ def _extract_clean_text_from_html(html_content: str) -> str:
     Returns:
         Clean text content with proper spacing
     """
+    # Some senders put plain text under a text/html mime-type
+    if '<' not in html_content:
+        return _normalize_whitespace(unescape(html_content))
+
+    if (
+        len(html_content) < _SMALL_HTML_SIZE
+        and html_content.count('<') < _SMALL_HTML_MAX_TAGS
+        and not _NON_TEXT_MARKUP_RE.search(html_content)
+        and not _BARE_LT_RE.search(html_content)
+    ):
+        return _normalize_whitespace(unescape(_TAG_RE.sub('', html_content)))
+
+    if LexborHTMLParser is not None:
+        try:
+            return _normalize_whitespace(_extract_text_with_selectolax(html_content))
+        except Exception as e:
+            logger.warning(f"Error parsing HTML with selectolax, falling back to BeautifulSoup: {e}")
+
     try:
         # Parse HTML with BeautifulSoup
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = BeautifulSoup(html_content, HTML_PARSER)
 
         # Remove script and style elements completely
-        for script in soup(["script", "style"]):
-            script.decompose()
+        for element in soup.find_all(["script", "style"]):
+            element.decompose()
 
         # Remove comments
-        from bs4 import Comment
         for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
             comment.extract()
 
-        # Get text content
-        text = soup.get_text()
-
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-
-        return text
+        # Get text content and clean up whitespace
+        return _normalize_whitespace(soup.get_text())
 
     except Exception as e:
         logger.warning(f"Error parsing HTML with BeautifulSoup: {e}")
         # Fallback to simple regex if BeautifulSoup fails
-        import re
-        return re.sub(r'<[^>]+>', '', html_content)
+        return _TAG_RE.sub('', html_content)
 
 
 def get_headers(message: Dict[str, Any]) -> Dict[str, str]:
@@ -70,72 +117,159 @@ def get_headers(message: Dict[str, Any]) -> Dict[str, str]:
     Returns:
         Dictionary of header name -> value
     """
-    headers = {}
-    payload = message.get('payload', {})
-    header_list = payload.get('headers', [])
-    
-    for header in header_list:
-        name = header.get('name', '').lower()
-        value = header.get('value', '')
-        headers[name] = value
-    
-    return headers
+    return {
+        header.get('name', '').lower(): header.get('value', '')
+        for header in message.get('payload', {}).get('headers', [])
+    }
 
 
-def extract_message_body(message: Dict[str, Any], html_part:bool = False, strip_html:bool = False ) -> str:
+def _decode_body_data(data: str) -> str:
+    """Decode a base64url MIME part body straight from ASCII bytes to text."""
+    return base64.urlsafe_b64decode(data.encode('ascii')).decode('utf-8', errors='ignore')
+
+
+def _iter_parts(payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield a message payload and all nested MIME parts depth-first, in document order."""
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        yield part
+        if 'parts' in part:
+            # Reversed so parts are popped in their original order
+            stack.extend(reversed(part['parts']))
+
+
+def _walk_message(
+    message: Dict[str, Any],
+    plain: bool = False,
+    html: bool = False,
+    strip_html: bool = False,
+    attachments: bool = False
+) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
     """
-    Extract the text body from a Gmail message. By default, returns the text/plain part. If html_part is True, returns the text/html part.
-    
+    Walk a message's MIME tree once, collecting the requested content.
+
     Args:
         message: Gmail message object
-        html_part: Whether to extract HTML part or Plain Text (default: False)
-        strip_html: Whether to strip HTML tags from the body (default: False)
-        
+        plain: Collect text/plain bodies
+        html: Collect text/html bodies
+        strip_html: Convert collected HTML bodies to clean text
+        attachments: Collect attachment information
+
     Returns:
-        Extracted text content
+        Tuple of ({'text/plain': ..., 'text/html': ...}, attachments)
     """
-    def extract_text_from_part(part: Dict[str, Any], html_part:bool, strip_html:bool ) -> str:
-        """Recursively extract text from message parts."""
-        text = ""
+    plain_chunks: List[str] = []
+    html_chunks: List[str] = []
+    found_attachments: List[Dict[str, Any]] = []
+
+    for part in _iter_parts(message.get('payload', {})):
         mime_type = part.get('mimeType', '')
-        
-        if mime_type == 'text/plain' and not html_part:
+
+        if mime_type == 'text/plain' and plain:
             data = part.get('body', {}).get('data', '')
             if data:
                 try:
-                    decoded = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
-                    text += decoded
+                    plain_chunks.append(_decode_body_data(data))
                 except Exception as e:
                     logger.warning(f"Error decoding text/plain part: {e}")
-        
-        elif mime_type == 'text/html' and html_part:
+
+        elif mime_type == 'text/html' and html:
             data = part.get('body', {}).get('data', '')
             if data:
                 try:
-                    decoded = base64.urlsafe_b64decode(data).decode('utf-8', errors='ignore')
+                    decoded = _decode_body_data(data)
                     if strip_html:
                         # Use BeautifulSoup for proper HTML parsing and text extraction
-                        text += _extract_clean_text_from_html(decoded)
-                    else:
-                        text += decoded
+                        decoded = _extract_clean_text_from_html(decoded)
+                    html_chunks.append(decoded)
                 except Exception as e:
                     logger.warning(f"Error decoding text/html part: {e}")
-        
-        # Handle multipart messages
-        if 'parts' in part:
-            for subpart in part['parts']:
-                text += extract_text_from_part(subpart, html_part, strip_html)
-        
-        return text
+
+        if attachments:
+            filename = part.get('filename', '')
+            if filename:
+                body = part.get('body', {})
+                if body.get('attachmentId'):
+                    found_attachments.append({
+                        'filename': filename,
+                        'mimeType': mime_type,
+                        'attachmentId': body.get('attachmentId'),
+                        'size': body.get('size', 0)
+                    })
+
+    bodies = {
+        'text/plain': ''.join(plain_chunks).strip(),
+        'text/html': ''.join(html_chunks).strip(),
+    }
+    return bodies, found_attachments
+
+
+def extract_message_body(message: Dict[str, Any], html_part:bool = False, strip_html:bool = False ) -> str:
+    """
+    Extract the text body from a Gmail message. By default, returns the text/plain part. If html_part is True, returns the text/html part.
     
+    Args:
+        message: Gmail message object
+        html_part: Whether to extract HTML part or Plain Text (default: False)
+        strip_html: Whether to strip HTML tags from the body (default: False)
+        
+    Returns:
+        Extracted text content
+    """
     try:
-        payload = message.get('payload', {})
-        return extract_text_from_part(payload, html_part, strip_html).strip()
+        bodies, _ = _walk_message(message, plain=not html_part, html=html_part, strip_html=strip_html)
+        return bodies['text/html' if html_part else 'text/plain']
     except Exception as e:
         logger.error(f"Error extracting message body: {e}")
         return ""
 
 
+def extract_message_bodies(message: Dict[str, Any], strip_html: bool = False) -> Dict[str, str]:
+    """
+    Extract both the text/plain and text/html bodies from a Gmail message in one pass.
+
+    Args:
+        message: Gmail message object
+        strip_html: Whether to strip HTML tags from the HTML body (default: False)
+
+    Returns:
+        Dictionary with 'text/plain' and 'text/html' keys (empty strings if missing)
+    """
+    try:
+        bodies, _ = _walk_message(message, plain=True, html=True, strip_html=strip_html)
+        return bodies
+    except Exception as e:
+        logger.error(f"Error extracting message bodies: {e}")
+        return {'text/plain': '', 'text/html': ''}
+
+
+def extract_body_and_attachments(
+    message: Dict[str, Any],
+    html_part: bool = False,
+    strip_html: bool = False
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Extract the text body and attachment information from a Gmail message in one pass.
+
+    Args:
+        message: Gmail message object
+        html_part: Whether to extract HTML part or Plain Text (default: False)
+        strip_html: Whether to strip HTML tags from the body (default: False)
+
+    Returns:
+        Tuple of (body text, list of attachment dictionaries)
+    """
+    try:
+        bodies, attachments = _walk_message(
+            message, plain=not html_part, html=html_part, strip_html=strip_html, attachments=True
+        )
+        return bodies['text/html' if html_part else 'text/plain'], attachments
+    except Exception as e:
+        logger.error(f"Error extracting message body and attachments: {e}")
+        return "", []
+
+
 def extract_attachments(message: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Extract attachment information from a Gmail message.
@@ -146,30 +280,9 @@ def extract_attachments(message: Dict[str, Any]) -> List[Dict[str, Any]]:
     Returns:
         List of attachment dictionaries with filename, mimeType, and attachmentId
     """
-    attachments = []
-    
-    def find_attachments_in_part(part: Dict[str, Any]) -> None:
-        """Recursively find attachments in message parts."""
-        filename = part.get('filename', '')
-        if filename:
-            body = part.get('body', {})
-            if body.get('attachmentId'):
-                attachments.append({
-                    'filename': filename,
-                    'mimeType': part.get('mimeType', ''),
-                    'attachmentId': body.get('attachmentId'),
-                    'size': body.get('size', 0)
-                })
-        
-        # Check parts recursively
-        if 'parts' in part:
-            for subpart in part['parts']:
-                find_attachments_in_part(subpart)
-    
     try:
-        payload = message.get('payload', {})
-        find_attachments_in_part(payload)
+        _, attachments = _walk_message(message, attachments=True)
+        return attachments
     except Exception as e:
         logger.error(f"Error extracting attachments: {e}")
-    
-    return attachments
+        return []
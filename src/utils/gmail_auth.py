@@ -0,0 +1,123 @@
+"""
+Gmail credential and API client caches.
+
+Credentials and Gmail API clients are shared by GmailHandler and WatchManager,
+so private keys, OAuth tokens and the discovery document are parsed once per
+process.
+"""
+
+import base64
+import functools
+import threading
+from typing import Dict, Any, Optional, Tuple
+import orjson
+from google.oauth2 import service_account
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build, Resource
+from googleapiclient.http import HttpRequest, build_http
+
+# Gmail scopes
+SCOPES = [
+    'https://www.googleapis.com/auth/gmail.readonly',
+    'https://www.googleapis.com/auth/gmail.modify'
+]
+
+# Gmail API clients shared by all handlers in this process, keyed by credential identity
+_services: Dict[Tuple, Resource] = {}
+_services_lock = threading.Lock()
+
+# Per-thread authorized transports: httplib2.Http is not thread-safe, so every thread
+# gets its own connection for each account while the parsed client is shared
+_thread_local = threading.local()
+
+# Service account credentials built by this process, keyed by account and delegated subject
+_service_account_credentials: Dict[Tuple, service_account.Credentials] = {}
+_service_account_credentials_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def load_oauth_credentials(token_base64: str) -> Credentials:
+    """Decode and parse the base64 OAuth token once per process (per token value)."""
+    # Decode from base64 and parse JSON (orjson parses the bytes directly)
+    token_data = orjson.loads(base64.b64decode(token_base64))
+    return Credentials.from_authorized_user_info(token_data, scopes=SCOPES)
+
+
+def load_service_account_credentials(
+    service_account_info: Dict[str, Any],
+    subject: Optional[str] = None
+) -> service_account.Credentials:
+    """
+    Get service account credentials, parsing the private key only once per account.
+
+    Args:
+        service_account_info: Service account credentials dictionary
+        subject: User to impersonate with domain-wide delegation, if any
+    """
+    key = (
+        service_account_info.get('client_email'),
+        service_account_info.get('private_key_id'),
+        subject,
+    )
+    with _service_account_credentials_lock:
+        credentials = _service_account_credentials.get(key)
+        if credentials is None:
+            kwargs = {'scopes': SCOPES}
+            if subject is not None:
+                kwargs['subject'] = subject
+            credentials = service_account.Credentials.from_service_account_info(
+                service_account_info, **kwargs
+            )
+            _service_account_credentials[key] = credentials
+        return credentials
+
+
+def _credentials_fingerprint(credentials: Any) -> Tuple:
+    """Identify the account a credentials object authenticates as."""
+    return (
+        type(credentials).__name__,
+        getattr(credentials, 'service_account_email', None),
+        getattr(credentials, '_subject', None),
+        getattr(credentials, 'client_id', None),
+        getattr(credentials, 'refresh_token', None),
+    )
+
+
+def _thread_http(key: Tuple, credentials: Any) -> AuthorizedHttp:
+    """Get the calling thread's authorized transport for an account."""
+    transports = getattr(_thread_local, 'transports', None)
+    if transports is None:
+        transports = _thread_local.transports = {}
+    http = transports.get(key)
+    if http is None:
+        http = transports[key] = AuthorizedHttp(credentials, http=build_http())
+    return http
+
+
+def get_gmail_service(credentials: Any) -> Resource:
+    """
+    Get the process-wide Gmail API client for the given credentials.
+
+    The client is built once from the discovery document bundled with
+    google-api-python-client (no network fetch) and shared by every handler
+    using the same account. Requests (including batches) are executed on a
+    transport owned by the calling thread, so the client is safe to use from
+    request handlers and background threads at the same time.
+    """
+    key = _credentials_fingerprint(credentials)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            def request_builder(http, *args, **kwargs) -> HttpRequest:
+                return HttpRequest(_thread_http(key, credentials), *args, **kwargs)
+
+            service = build(
+                'gmail', 'v1',
+                credentials=credentials,
+                requestBuilder=request_builder,
+                static_discovery=True,
+                cache_discovery=False
+            )
+            _services[key] = service
+        return service
@@ -6,13 +6,122 @@ Configure TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID in your .env file to use these
 """
 
 import os
+import time
+import importlib.util
+import asyncio
+import threading
+import orjson
 import requests
-import html
-from typing import Optional, Dict, Any
+from datetime import datetime
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Mapping, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# HTTP/2 lets concurrent sends share one multiplexed connection (needs the h2 package)
+_HTTP2 = importlib.util.find_spec('h2') is not None
+
+# Shared session so the TLS connection to api.telegram.org stays warm between messages.
+# sendMessage is not idempotent, so only requests Telegram never received (connection
+# errors) or explicitly rejected (429) are retried; read timeouts and 5xx are not.
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        connect=3,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=(429,),
+        allowed_methods=["POST"],
+        raise_on_status=False
+    )
+))
+
+
+class _ChatRateLimiter:
+    """
+    Token bucket pacing sends below Telegram's limits (1 msg/s per chat, 30 msg/s overall).
+
+    Each send reserves the next free slot under a lock, so the limiter is shared
+    safely by worker threads and event-loop coroutines. A 429 pauses all sends
+    for the retry_after Telegram asks for.
+    """
+
+    def __init__(self, per_chat_rate: float = 1.0, global_rate: float = 30.0):
+        self._chat_interval = 1.0 / per_chat_rate
+        self._global_rate = global_rate
+        self._tokens = global_rate
+        self._last_refill = time.monotonic()
+        self._last_send: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.pause_until = 0.0
+
+    def _reserve(self, chat: str) -> float:
+        """Reserve a send slot for chat and return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._global_rate, self._tokens + (now - self._last_refill) * self._global_rate)
+            self._last_refill = now
+            self._tokens -= 1
+
+            start = max(now, self.pause_until, self._last_send.get(chat, now - self._chat_interval) + self._chat_interval)
+            if self._tokens < 0:
+                start = max(start, now - self._tokens / self._global_rate)
+            self._last_send[chat] = start
+            return start - now
+
+    def pause(self, seconds: float) -> None:
+        """Hold all sends for the given number of seconds."""
+        with self._lock:
+            self.pause_until = max(self.pause_until, time.monotonic() + seconds)
+
+    async def acquire(self, chat: str) -> None:
+        """Wait (without blocking the event loop) until chat may send."""
+        delay = self._reserve(chat)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_blocking(self, chat: str) -> None:
+        """Wait (blocking the calling thread) until chat may send."""
+        delay = self._reserve(chat)
+        if delay > 0:
+            time.sleep(delay)
+
+
+_rate_limiter = _ChatRateLimiter()
+
+# Per-thread sendMessage payload reused by send_telegram_message
+_tls = threading.local()
+
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Email notifications arriving within this many seconds are combined into one message
+BATCH_WINDOW = 1.5
+# Combined messages stay below Telegram's 4096 character limit
+MAX_BATCH_LENGTH = 4000
+BATCH_SEPARATOR = "\n\n━━━━━━\n\n"
+
+# HTML escape mapping for Telegram's HTML parse mode
+_TG_HTML_TABLE = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&#x27;',
+})
+
 
 def escape_html_for_telegram(text: str) -> str:
     """
@@ -30,11 +139,14 @@ def escape_html_for_telegram(text: str) -> str:
     if not text:
         return ""
 
-    # Use Python's html.escape to escape HTML characters
-    # This will convert < > & " ' to their HTML entities
-    escaped = html.escape(text, quote=True)
+    # Most subjects and senders contain nothing to escape; these substring checks
+    # are far cheaper than translate's per-character mapping lookups
+    if '&' not in text and '<' not in text and '>' not in text and '"' not in text and "'" not in text:
+        return text
 
-    return escaped
+    # Converts < > & " ' to their HTML entities (same output as html.escape(text, quote=True))
+    # in a single pass over the string
+    return text.translate(_TG_HTML_TABLE)
 
 
 def send_telegram_message(
@@ -44,7 +156,8 @@ def send_telegram_message(
     parse_mode: str = "HTML",
     disable_web_page_preview: bool = True,
     timeout: int = 10,
-    auto_escape_html: bool = True
+    auto_escape_html: bool = True,
+    return_message: bool = False
 ) -> Dict[str, Any]:
     """
     Send a message to Telegram via HTTP request.
@@ -57,6 +170,7 @@ def send_telegram_message(
         disable_web_page_preview: Whether to disable link previews
         timeout: Request timeout in seconds
         auto_escape_html: Whether to automatically escape HTML characters when parse_mode="HTML"
+        return_message: Include the sent (escaped) text in the result under 'message'
 
     Returns:
         Dictionary with success status and response data
@@ -79,23 +193,100 @@ def send_telegram_message(
             print(f"Failed to send: {result['error']}")
     """
     
-    # Get credentials from environment or parameters
-    token = bot_token or os.environ.get('TELEGRAM_BOT_TOKEN')
-    chat = chat_id or os.environ.get('TELEGRAM_CHAT_ID')
-    
-    # Validate configuration
+    # Reuse this thread's payload dict: the synchronous send serializes it before returning
+    buffer = getattr(_tls, 'payload', None)
+    if buffer is None:
+        buffer = _tls.payload = {}
+
+    url, payload = _build_request(
+        message, bot_token, chat_id, parse_mode, disable_web_page_preview, auto_escape_html,
+        payload=buffer
+    )
+    if url is None:
+        return _with_message(payload, message, return_message)
+
+    return _with_message(_post_message(url, payload, timeout), payload['text'], return_message)
+
+
+def _with_message(result: Dict[str, Any], text: str, return_message: bool) -> Dict[str, Any]:
+    """Add the message text to a send result when the caller asked for it."""
+    if return_message:
+        result['message'] = text
+    return result
+
+
+def _validate_credentials(token: Optional[str], chat: Optional[str]) -> Tuple[str, str, str]:
+    """
+    Check the bot token and chat ID are configured and build the sendMessage URL.
+
+    Returns:
+        Tuple of (token, chat_id, url)
+
+    Raises:
+        ValueError: If the token or chat ID is missing or still a placeholder
+    """
     if not token or token == 'your-bot-token-here':
-        return {
-            'success': False,
-            'error': 'TELEGRAM_BOT_TOKEN not configured. Get token from @BotFather on Telegram.',
-            'message': message
-        }
-    
+        raise ValueError('TELEGRAM_BOT_TOKEN not configured. Get token from @BotFather on Telegram.')
+
     if not chat or chat == 'your-chat-id-here':
-        return {
+        raise ValueError('TELEGRAM_CHAT_ID not configured. Message your bot and visit: https://api.telegram.org/bot<TOKEN>/getUpdates')
+
+    return token, chat, f"https://api.telegram.org/bot{token}/sendMessage"
+
+
+# Default (environment) credentials, checked once at startup (or first send): the
+# validated (token, chat_id, url) when sending is enabled, otherwise the read-only
+# result returned for every send. Both stay None until the check has run.
+_default_credentials: Optional[Tuple[str, str, str]] = None
+_disabled_result: Optional[Mapping[str, Any]] = None
+
+
+def _init_telegram() -> bool:
+    """Validate the default Telegram credentials once and return whether sending is enabled."""
+    global _default_credentials, _disabled_result
+    if _default_credentials is None and _disabled_result is None:
+        try:
+            _default_credentials = _validate_credentials(
+                os.environ.get('TELEGRAM_BOT_TOKEN'), os.environ.get('TELEGRAM_CHAT_ID')
+            )
+        except ValueError as e:
+            _disabled_result = MappingProxyType({'success': False, 'error': str(e)})
+    return _default_credentials is not None
+
+
+def _build_request(
+    message: str,
+    bot_token: Optional[str],
+    chat_id: Optional[str],
+    parse_mode: str,
+    disable_web_page_preview: bool,
+    auto_escape_html: bool,
+    payload: Optional[Dict[str, Any]] = None
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Validate the Telegram configuration and build a sendMessage request.
+
+    If payload is given, it is cleared and filled in place instead of allocating
+    a new dict (only safe when the request is serialized before the dict is reused).
+
+    Returns:
+        Tuple of (url, payload), or (None, error result) if not configured
+    """
+    try:
+        if bot_token is None and chat_id is None:
+            # Default credentials are validated once and reused
+            if not _init_telegram():
+                return None, dict(_disabled_result)
+            token, chat, url = _default_credentials
+        else:
+            token, chat, url = _validate_credentials(
+                bot_token or os.environ.get('TELEGRAM_BOT_TOKEN'),
+                chat_id or os.environ.get('TELEGRAM_CHAT_ID')
+            )
+    except ValueError as e:
+        return None, {
             'success': False,
-            'error': 'TELEGRAM_CHAT_ID not configured. Message your bot and visit: https://api.telegram.org/bot<TOKEN>/getUpdates',
-            'message': message
+            'error': str(e)
         }
     
     # Escape HTML characters if using HTML parse mode and auto-escape is enabled
@@ -103,75 +294,348 @@ def send_telegram_message(
         message = escape_html_for_telegram(message)
 
     # Prepare API request
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-
-    payload = {
-        'chat_id': chat,
-        'text': message,
-        'disable_web_page_preview': disable_web_page_preview
-    }
+    if payload is None:
+        payload = {}
+    else:
+        payload.clear()
+    payload['chat_id'] = chat
+    payload['text'] = message
+    payload['disable_web_page_preview'] = disable_web_page_preview
 
     if parse_mode:
         payload['parse_mode'] = parse_mode
-    
+
+    return url, payload
+
+
+def _post_message(url: str, payload: Dict[str, Any], timeout: int = 10) -> Dict[str, Any]:
+    """Send a prepared sendMessage request synchronously over the shared session."""
+    chat = payload['chat_id']
+
     try:
-        logger.info(f"Sending Telegram message to chat {chat}")
+        _rate_limiter.acquire_blocking(chat)
+        logger.debug("Sending Telegram message to chat %s", chat)
         
-        response = requests.post(
+        response = _session.post(
             url,
-            json=payload,
+            data=orjson.dumps(payload),
             timeout=timeout,
-            headers={'Content-Type': 'application/json'}
+            headers=_JSON_HEADERS
         )
         
-        response_data = response.json()
+        response_data = orjson.loads(response.content)
         
         if response.status_code == 200 and response_data.get('ok'):
-            logger.info("✅ Telegram message sent successfully")
+            logger.debug("✅ Telegram message sent successfully")
             return {
                 'success': True,
                 'message_id': response_data.get('result', {}).get('message_id'),
-                'response': response_data,
-                'message': message
+                'response': response_data
             }
         else:
+            if response.status_code == 429:
+                # Retries are exhausted; hold further sends for as long as Telegram asks
+                _rate_limiter.pause(response_data.get('parameters', {}).get('retry_after', 1))
             error_msg = response_data.get('description', f'HTTP {response.status_code}')
             logger.error(f"❌ Telegram API error: {error_msg}")
             return {
                 'success': False,
                 'error': error_msg,
-                'response': response_data,
-                'message': message
+                'response': response_data
             }
             
-    except requests.exceptions.Timeout:
-        error_msg = f"Request timeout after {timeout} seconds"
-        logger.error(f"❌ Telegram request timeout: {error_msg}")
-        return {
-            'success': False,
-            'error': error_msg,
-            'message': message
-        }
-        
-    except requests.exceptions.RequestException as e:
-        error_msg = f"Network error: {str(e)}"
-        logger.error(f"❌ Telegram network error: {error_msg}")
-        return {
-            'success': False,
-            'error': error_msg,
-            'message': message
-        }
-        
-    except Exception as e:
-        error_msg = f"Unexpected error: {str(e)}"
-        logger.error(f"❌ Telegram unexpected error: {error_msg}")
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+        # Timeout is a RequestException; a non-JSON body (e.g. a proxy error page) is a JSONDecodeError.
+        # Anything else is a bug and propagates.
+        if isinstance(e, requests.exceptions.Timeout):
+            error_msg = f"Request timed out ({timeout}s timeout per attempt)"
+        else:
+            error_msg = f"Network error: {str(e)}"
+        logger.exception(f"❌ Telegram request failed: {error_msg}")
         return {
             'success': False,
-            'error': error_msg,
-            'message': message
+            'error': error_msg
         }
 
 
+class TelegramNotifier:
+    """
+    Fire-and-forget Telegram sender running on the application's event loop.
+
+    Messages are queued and posted by a few worker coroutines over a shared
+    httpx client (HTTP/2 when available), so callers (including worker threads)
+    never wait for the Telegram round-trip. When the notifier isn't running, httpx isn't
+    installed or the queue is full, messages are sent synchronously instead.
+
+    Batched messages for the same chat that arrive within BATCH_WINDOW seconds
+    are combined into a single Telegram message.
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = 1000, timeout: int = 10):
+        self._workers = workers
+        self._queue_size = queue_size
+        self._timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._client = None
+        self._tasks: List[asyncio.Task] = []
+        self._batches: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether queued sending is available."""
+        return self._loop is not None and not self._loop.is_closed()
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """The event loop the notifier was started on, or None if it isn't started."""
+        return self._loop
+
+    async def start(self) -> None:
+        """Start the worker coroutines on the current event loop."""
+        if self.running:
+            return
+        if not _init_telegram():
+            logger.info(f"Telegram notifications disabled: {_disabled_result['error']}")
+        if httpx is None:
+            logger.info("httpx not installed, Telegram messages will be sent synchronously")
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._client = httpx.AsyncClient(
+            http2=_HTTP2,
+            timeout=self._timeout,
+            limits=httpx.Limits(max_keepalive_connections=4, max_connections=8)
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+        logger.info(f"Telegram notifier started with {self._workers} workers (HTTP/2: {_HTTP2})")
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Send the messages still queued (up to drain_timeout seconds), then shut down."""
+        if not self.running:
+            return
+
+        self._flush_batches()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self._queue.qsize()} queued Telegram messages on shutdown")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._client.aclose()
+
+        self._loop = None
+        self._queue = None
+        self._client = None
+        self._tasks = []
+        logger.info("Telegram notifier stopped")
+
+    def enqueue(self, url: str, payload: Dict[str, Any], batch: bool = False) -> bool:
+        """
+        Queue a prepared sendMessage request. Safe to call from any thread.
+
+        Args:
+            url: sendMessage URL
+            payload: sendMessage payload
+            batch: Combine with other batched messages for the same chat
+
+        Returns:
+            False if the notifier isn't running (the caller should send synchronously)
+        """
+        loop = self._loop
+        if loop is None:
+            return False
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        add = self._add_to_batch if batch else self._put
+        try:
+            if running_loop is loop:
+                add(url, payload)
+            else:
+                loop.call_soon_threadsafe(add, url, payload)
+        except RuntimeError:
+            # Event loop closed underneath us
+            return False
+        return True
+
+    def _put(self, url: str, payload: Dict[str, Any]) -> None:
+        """Add a request to the queue, falling back to a synchronous send when full."""
+        try:
+            self._queue.put_nowait((url, payload))
+        except asyncio.QueueFull:
+            logger.warning("Telegram queue full, sending message synchronously")
+            self._loop.run_in_executor(None, _post_message, url, payload, self._timeout)
+
+    def _add_to_batch(self, url: str, payload: Dict[str, Any]) -> None:
+        """Add a request to its chat's pending batch and arm the flush timer."""
+        key = (url, payload['chat_id'])
+        pending = self._batches.setdefault(key, [])
+
+        # Send what's pending right away if this message would push it over the limit
+        pending_length = sum(len(p['text']) + len(BATCH_SEPARATOR) + 16 for p in pending)
+        if pending and pending_length + len(payload['text']) > MAX_BATCH_LENGTH:
+            self._flush_batch(key)
+            pending = self._batches.setdefault(key, [])
+
+        pending.append(payload)
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(BATCH_WINDOW, self._flush_batches)
+
+    def _flush_batches(self) -> None:
+        """Queue every pending batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for key in list(self._batches):
+            self._flush_batch(key)
+
+    def _flush_batch(self, key: Tuple[str, str]) -> None:
+        """Combine one chat's pending messages into a single request and queue it."""
+        pending = self._batches.pop(key, None)
+        if not pending:
+            return
+
+        url = key[0]
+        if len(pending) == 1:
+            self._put(url, pending[0])
+            return
+
+        total = len(pending)
+        text = BATCH_SEPARATOR.join(
+            f"<b>[{index}/{total}]</b>\n{p['text']}" for index, p in enumerate(pending, 1)
+        )
+        logger.debug("Combining %d Telegram notifications into one message", total)
+        self._put(url, {**pending[0], 'text': text})
+
+    async def _worker(self) -> None:
+        """Post queued requests until cancelled."""
+        while True:
+            url, payload = await self._queue.get()
+            try:
+                await self._post(url, payload)
+            except Exception as e:
+                logger.error(f"❌ Telegram send error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _post(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Post one request within the rate limits, retrying once after a 429."""
+        for attempt in range(2):
+            await _rate_limiter.acquire(payload['chat_id'])
+            response = await self._client.post(url, content=orjson.dumps(payload), headers=_JSON_HEADERS)
+            response_data = orjson.loads(response.content)
+
+            if response.status_code == 429:
+                retry_after = response_data.get('parameters', {}).get('retry_after', 1)
+                _rate_limiter.pause(retry_after)
+                if attempt == 0:
+                    logger.warning(f"Telegram rate limit hit, retrying in {retry_after}s")
+                    continue
+
+            if response.status_code == 200 and response_data.get('ok'):
+                logger.debug("✅ Telegram message sent successfully")
+                return {
+                    'success': True,
+                    'message_id': response_data.get('result', {}).get('message_id'),
+                    'response': response_data
+                }
+
+            error_msg = response_data.get('description', f'HTTP {response.status_code}')
+            logger.error(f"❌ Telegram API error: {error_msg}")
+            return {
+                'success': False,
+                'error': error_msg,
+                'response': response_data
+            }
+
+    async def send(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Post a prepared request on the notifier's client and wait for the result."""
+        try:
+            return await self._post(url, payload)
+        except Exception as e:
+            error_msg = f"Network error: {str(e)}"
+            logger.error(f"❌ Telegram network error: {error_msg}")
+            return {
+                'success': False,
+                'error': error_msg
+            }
+
+
+# Process-wide notifier, started and stopped with the FastAPI app
+telegram_notifier = TelegramNotifier()
+
+
+def enqueue_telegram_message(
+    message: str,
+    bot_token: Optional[str] = None,
+    chat_id: Optional[str] = None,
+    parse_mode: str = "HTML",
+    disable_web_page_preview: bool = True,
+    timeout: int = 10,
+    auto_escape_html: bool = True,
+    batch: bool = False,
+    return_message: bool = False
+) -> Dict[str, Any]:
+    """
+    Queue a message for background sending, or send it now if the notifier isn't running.
+
+    Takes the same arguments as send_telegram_message, plus batch to combine the
+    message with others sent to the same chat within BATCH_WINDOW seconds (the
+    text must then be HTML, as batches are numbered with <b> tags). A queued
+    message returns {'success': True, 'queued': True}; delivery errors are only logged.
+    """
+    url, payload = _build_request(
+        message, bot_token, chat_id, parse_mode, disable_web_page_preview, auto_escape_html
+    )
+    if url is None:
+        return _with_message(payload, message, return_message)
+
+    if telegram_notifier.enqueue(url, payload, batch=batch):
+        result = {'success': True, 'queued': True}
+    else:
+        result = _post_message(url, payload, timeout)
+    return _with_message(result, payload['text'], return_message)
+
+
+async def send_telegram_message_async(
+    message: str,
+    bot_token: Optional[str] = None,
+    chat_id: Optional[str] = None,
+    parse_mode: str = "HTML",
+    disable_web_page_preview: bool = True,
+    timeout: int = 10,
+    auto_escape_html: bool = True,
+    return_message: bool = False
+) -> Dict[str, Any]:
+    """
+    Send a message to Telegram and await the result without blocking the event loop.
+
+    Takes the same arguments and returns the same result as send_telegram_message.
+    Concurrent calls (e.g. via asyncio.gather) are multiplexed over the notifier's
+    HTTP/2 connection when it is running on this loop; otherwise the synchronous
+    send runs in a worker thread.
+    """
+    url, payload = _build_request(
+        message, bot_token, chat_id, parse_mode, disable_web_page_preview, auto_escape_html
+    )
+    if url is None:
+        return _with_message(payload, message, return_message)
+
+    if telegram_notifier.running and telegram_notifier.loop is asyncio.get_running_loop():
+        result = await telegram_notifier.send(url, payload)
+    else:
+        result = await asyncio.to_thread(_post_message, url, payload, timeout)
+    return _with_message(result, payload['text'], return_message)
+
+
 def send_email_notification(
     subject: str,
     sender: str,
@@ -180,7 +644,7 @@ def send_email_notification(
     message_id: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    Send a formatted email notification to Telegram.
+    Send a formatted email notification to Telegram (queued when the notifier is running).
     
     Args:
         subject: Email subject line
@@ -202,42 +666,45 @@ def send_email_notification(
         )
     """
     
-    # Escape user content to prevent HTML parsing errors
-    safe_sender = escape_html_for_telegram(sender)
-    safe_subject = escape_html_for_telegram(subject)
-    safe_preview = escape_html_for_telegram(preview[:500])
+    _esc = escape_html_for_telegram
+    preview_trunc = preview[:500]
+    overflow = '...' if len(preview) > 500 else ''
 
-    # Format the notification message with escaped content
-    message_lines = [
-        "📧 <b>New Email Received</b>",
-        "",
-        f"<b>From:</b> {safe_sender}",
-        f"<b>Subject:</b> {safe_subject}",
-    ]
+    # Escape user content to prevent HTML parsing errors
+    safe_sender = _esc(sender)
+    safe_subject = _esc(subject)
+    safe_preview = _esc(preview_trunc)
 
+    labels_line = ""
     if labels:
         labels_str = ", ".join(labels) if isinstance(labels, list) else str(labels)
-        safe_labels = escape_html_for_telegram(labels_str)
-        message_lines.append(f"<b>Labels:</b> {safe_labels}")
+        labels_line = f"\n<b>Labels:</b> {_esc(labels_str)}"
 
+    message_id_line = ""
     if message_id:
-        safe_message_id = escape_html_for_telegram(message_id)
-        message_lines.append(f"<b>Message ID:</b> <code>{safe_message_id}</code>")
-
-    message_lines.extend([
-        "",
-        f"<b>Preview:</b>",
-        f"<i>{safe_preview}{'...' if len(preview) > 500 else ''}</i>"
-    ])
+        message_id_line = f"\n<b>Message ID:</b> <code>{_esc(message_id)}</code>"
 
-    message = "\n".join(message_lines)
+    # Format the notification message with escaped content
+    message = (
+        f"📧 <b>New Email Received</b>\n"
+        f"\n"
+        f"<b>From:</b> {safe_sender}\n"
+        f"<b>Subject:</b> {safe_subject}"
+        f"{labels_line}"
+        f"{message_id_line}\n"
+        f"\n"
+        f"<b>Preview:</b>\n"
+        f"<i>{safe_preview}{overflow}</i>"
+    )
 
-    # Send with auto_escape_html=False to avoid double-escaping since we manually escaped content
-    return send_telegram_message(
+    # Send with auto_escape_html=False to avoid double-escaping since we manually escaped content.
+    # Queued when the notifier is running so email processing doesn't wait on Telegram.
+    return enqueue_telegram_message(
         message,
         parse_mode="HTML",
         disable_web_page_preview=True,
-        auto_escape_html=False
+        auto_escape_html=False,
+        batch=True
     )
 
 
@@ -291,7 +758,7 @@ def test_telegram_configuration() -> Dict[str, Any]:
         "🤖 <b>Telegram Bot Test</b>\n\n"
         "✅ Configuration successful!\n"
         "Your Gmail Pub/Sub bot can now send notifications to this chat.\n\n"
-        f"<i>Test sent at {__import__('datetime').datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</i>"
+        f"<i>Test sent at {datetime.now().strftime(_TIMESTAMP_FORMAT)}</i>"
     )
     
     result = send_telegram_message(test_message)
@@ -1,15 +1,19 @@
 """Gmail watch subscription manager."""
 
 from typing import Dict, Any, Optional
-from google.oauth2 import service_account
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build, Resource
+from googleapiclient.discovery import Resource
 from googleapiclient.errors import HttpError
 from src.utils.logger import setup_logger
-from src.config import config
-import json
+from src.config import get_config
+from src.utils.gmail_auth import (
+    get_gmail_service,
+    load_oauth_credentials,
+    load_service_account_credentials,
+)
+import asyncio
+import logging
 import os
-import base64
 
 logger = setup_logger(__name__)
 
@@ -24,15 +28,11 @@ class WatchManager:
         Args:
             service_account_info: Service account credentials dictionary (for workspace accounts)
         """
+        config = get_config()
         account_type = config.get_gmail_account_type()
         logger.info(f"Initializing watch manager for account type: {account_type}")
 
-        # Define Gmail scopes
-        scopes = [
-            'https://www.googleapis.com/auth/gmail.readonly',
-            'https://www.googleapis.com/auth/gmail.modify'
-        ]
-
+        # Credentials and the Gmail API client are cached per process and shared with GmailHandler
         if account_type == "oauth":
             # Use OAuth refresh token for personal Gmail
             self.credentials = self._get_oauth_credentials()
@@ -43,19 +43,15 @@ class WatchManager:
             delegated_user_email = os.getenv('DELEGATED_USER_EMAIL') or config.config.get('workspace', {}).get('delegated_user_email', '')
             logger.info(f"Using workspace delegation for user: {delegated_user_email}")
 
-            self.credentials = service_account.Credentials.from_service_account_info(
+            self.credentials = load_service_account_credentials(
                 service_account_info,
-                scopes=scopes,
                 subject=delegated_user_email
             )
 
         else:
             # Fallback to service account (for backward compatibility)
             logger.info("Using service account credentials")
-            self.credentials = service_account.Credentials.from_service_account_info(
-                service_account_info,
-                scopes=scopes
-            )
+            self.credentials = load_service_account_credentials(service_account_info)
 
         self.service: Optional[Resource] = None
 
@@ -75,16 +71,9 @@ class WatchManager:
             )
 
         try:
-            # Decode from base64 and parse JSON
-            token_json = base64.b64decode(token_base64).decode('utf-8')
-            token_data = json.loads(token_json)
-
-            return Credentials.from_authorized_user_info(token_data, scopes=[
-                'https://www.googleapis.com/auth/gmail.readonly',
-                'https://www.googleapis.com/auth/gmail.modify'
-            ])
+            return load_oauth_credentials(token_base64)
 
-        except (json.JSONDecodeError, ValueError, Exception) as e:
+        except (ValueError, Exception) as e:
             logger.error(f"Error parsing OAuth token from environment: {e}")
             raise ValueError(
                 f"Invalid OAuth token in GMAIL_OAUTH_TOKEN_JSON environment variable: {e}. "
@@ -94,11 +83,13 @@ class WatchManager:
     def get_service(self) -> Resource:
         """Get or create Gmail API service."""
         if not self.service:
-            logger.info("Building Gmail API service...")
-            self.service = build('gmail', 'v1', credentials=self.credentials)
-            logger.info("Gmail API service built successfully")
+            self.service = get_gmail_service(self.credentials)
         return self.service
     
+    async def prewarm(self) -> None:
+        """Build the Gmail API client in a worker thread so the first API call doesn't pay for it."""
+        await asyncio.to_thread(self.get_service)
+
     def renew_watch(self) -> Dict[str, Any]:
         """
         Renew Gmail watch subscription.
@@ -108,6 +99,7 @@ class WatchManager:
         """
         try:
             service = self.get_service()
+            config = get_config()
             project_id = config.get_project_id()
             topic_name = config.get_topic_name()
 
@@ -116,21 +108,6 @@ class WatchManager:
 
             logger.info(f"Renewing Gmail watch for topic: {topic_resource}")
 
-            # First, try to stop any existing watch to avoid precondition errors
-            try:
-                logger.info("Attempting to stop existing watch first")
-                service.users().stop(userId='me').execute()
-                logger.info("Existing watch stopped successfully")
-            except HttpError as stop_error:
-                error_details = stop_error.error_details[0] if stop_error.error_details else {}
-                error_reason = error_details.get('reason', 'unknown')
-
-                if error_reason == 'failedPrecondition':
-                    logger.info("No existing watch to stop (precondition failed) - this is normal")
-                else:
-                    logger.warning(f"Error stopping existing watch: {stop_error}")
-                    logger.warning(f"Error reason: {error_reason}")
-
             # Get Gmail labels to watch - prefer label IDs if available
             gmail_label_ids = config.get_gmail_watch_label_ids()
             if gmail_label_ids:
@@ -149,14 +126,29 @@ class WatchManager:
             }
 
             logger.info("Executing watch request...")
-            # Execute watch request
-            response = service.users().watch(
-                userId='me',
-                body=watch_request
-            ).execute()
+            # watch() replaces an existing watch, so the old one is only stopped
+            # when Gmail rejects the renewal because of it
+            try:
+                response = service.users().watch(
+                    userId='me',
+                    body=watch_request
+                ).execute()
+            except HttpError as watch_error:
+                error_details = watch_error.error_details[0] if watch_error.error_details else {}
+                error_reason = error_details.get('reason', 'unknown')
+                if error_reason not in ('failedPrecondition', 'alreadyExists'):
+                    raise
+
+                logger.info(f"Watch request rejected ({error_reason}), stopping existing watch and retrying")
+                service.users().stop(userId='me').execute()
+                logger.info("Existing watch stopped successfully")
+                response = service.users().watch(
+                    userId='me',
+                    body=watch_request
+                ).execute()
             
-            logger.info("Execution complete with response: ")
-            logger.info(response)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Execution complete with response: %s", response)
 
             history_id = response.get('historyId')
             expiration = response.get('expiration')